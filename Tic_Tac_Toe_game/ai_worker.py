@@ -0,0 +1,75 @@
+"""Background AI search so the render loop never blocks on ai_strategic_move"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from game_engine import GameEngine
+
+class AIWorker:
+    """Runs one AI search at a time on a worker thread
+
+    The search works on a private GameEngine loaded from a snapshot of the
+    position, so the caller can keep mutating its own game while the worker
+    thinks. Random choices come from the game's own rng, so a game's seed
+    still decides the AI's moves. The private engine (and its search
+    cache) lives as long as the worker does. on_done, if given, is called
+    from the worker thread each time a search finishes, so a sleeping
+    caller can be woken up.
+    """
+    def __init__(self, on_done=None):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ai-search')
+        self.on_done = on_done
+        self.last_search = None  # (seconds, nodes) of the last finished search
+        self.engine = GameEngine()
+        self.future = None
+        self.cancel_event = None
+
+    def start(self, game, mark='O'):
+        """Start searching game's current position, cancelling any running search"""
+        self.cancel()
+        self.cancel_event = threading.Event()
+        self.future = self.executor.submit(self._search, game.snapshot(), game.size, game.win_length,
+                                           game.difficulty, game.search_time_budget, mark, game.rng,
+                                           self.cancel_event)
+        if self.on_done is not None:
+            self.future.add_done_callback(lambda future: self.on_done())
+
+    def _search(self, snapshot, size, win_length, difficulty, time_budget, mark, rng, cancel_event):
+        engine = self.engine
+        if (engine.size, engine.win_length) != (size, win_length):
+            engine.set_board_variant(size, win_length)
+        engine.restore(snapshot)
+        engine.difficulty = difficulty
+        engine.search_time_budget = time_budget
+        engine.cancel_event = cancel_event
+        engine.nodes_searched = 0
+        start = time.perf_counter()
+        try:
+            return engine.ai_strategic_move(mark, rng)
+        finally:
+            engine.cancel_event = None
+            self.last_search = (time.perf_counter() - start, engine.nodes_searched)
+
+    @property
+    def busy(self):
+        return self.future is not None and not self.future.done()
+
+    def result(self):
+        """The finished move, or None while the search is still running"""
+        if self.future is None or not self.future.done():
+            return None
+        move = self.future.result()
+        self.future = None
+        return move
+
+    def cancel(self):
+        """Abandon the current search; its result is never picked up"""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.future = None
+        self.cancel_event = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
+        self.engine.close()
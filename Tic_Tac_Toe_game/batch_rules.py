@@ -0,0 +1,115 @@
+"""NumPy-vectorized rule checks over large batches of boards
+
+Boards are an (N, 9) int8 array in row-major cell order with EMPTY, X and O
+cell values. Every function answers for the whole batch in one pass and
+agrees with the single-board GameEngine methods:
+
+    winners(boards)            ~ check_winner / check_winner_board
+    winning_moves(boards, X)   ~ find_winning_move(board, 'X')
+    blocking_moves(boards, O)  ~ find_blocking_move(board, 'O')
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from game_engine import CELLS, FULL_MASK, WIN_MASKS, WINNING
+
+EMPTY = 0
+X = 1
+O = 2
+TIE = 3  # Winner value for a full board with no line
+NO_MOVE = -1
+
+# Boards are packed into the same 9-bit masks GameEngine uses, then every
+# rule becomes a lookup into a 512-entry table indexed by mask
+CELL_BITS = (1 << np.arange(9)).astype(np.int16)
+WINNING_TABLE = np.array(WINNING, dtype=bool)
+
+def _completion_cells(mask):
+    cells = 0
+    for line in WIN_MASKS:
+        if len(CELLS[mask & line]) == 2:
+            cells |= line & ~mask
+    return cells
+
+# COMPLETION_TABLE[mask] has a bit set for every cell that finishes a line
+# in which mask already holds the other two cells
+COMPLETION_TABLE = np.array([_completion_cells(mask) for mask in range(FULL_MASK + 1)],
+                            dtype=np.int16)
+# Lowest set cell index per mask, NO_MOVE for 0
+FIRST_CELL_TABLE = np.array([cells[0] if cells else NO_MOVE for cells in CELLS], dtype=np.int8)
+
+BatchAnalysis = namedtuple('BatchAnalysis', [
+    'winner',          # (N,) int8: EMPTY, X, O or TIE
+    'empty',           # (N, 9) bool: empty cells
+    'winning_mask',    # (N, 9) bool: cells that win immediately for player
+    'blocking_mask',   # (N, 9) bool: cells that block the opponent's win
+    'winning_move',    # (N,) int8: first winning cell, NO_MOVE if none
+    'blocking_move',   # (N,) int8: first blocking cell, NO_MOVE if none
+])
+
+def boards_to_array(boards):
+    """Convert 3x3 list boards of 'X'/'O'/'' into an (N, 9) int8 array"""
+    values = {'': EMPTY, 'X': X, 'O': O}
+    return np.array([[values[cell] for row in board for cell in row] for board in boards],
+                    dtype=np.int8).reshape(-1, 9)
+
+def to_masks(boards):
+    """Pack (N, 9) boards into per-player (x_masks, o_masks) int16 arrays"""
+    boards = np.asarray(boards, dtype=np.int8)
+    x_masks = np.zeros(len(boards), dtype=np.int16)
+    o_masks = np.zeros(len(boards), dtype=np.int16)
+    for cell in range(9):
+        column = boards[:, cell]
+        x_masks |= (column == X) * CELL_BITS[cell]
+        o_masks |= (column == O) * CELL_BITS[cell]
+    return x_masks, o_masks
+
+def _unpack(masks):
+    return (masks[:, None] & CELL_BITS) != 0
+
+def _winners(x_masks, o_masks):
+    result = np.full(len(x_masks), EMPTY, dtype=np.int8)
+    result[(x_masks | o_masks) == FULL_MASK] = TIE
+    result[WINNING_TABLE[o_masks]] = O
+    result[WINNING_TABLE[x_masks]] = X
+    return result
+
+def winners(boards):
+    """Winner per board: X, O, TIE for a full board, else EMPTY"""
+    return _winners(*to_masks(boards))
+
+def _completion(own_masks, other_masks):
+    """Bitmask of empty cells that complete a line for own_masks"""
+    return COMPLETION_TABLE[own_masks] & ~(own_masks | other_masks)
+
+def winning_moves(boards, player):
+    """First empty cell per board that wins immediately for player, or NO_MOVE"""
+    x_masks, o_masks = to_masks(boards)
+    if player == X:
+        return FIRST_CELL_TABLE[_completion(x_masks, o_masks)]
+    return FIRST_CELL_TABLE[_completion(o_masks, x_masks)]
+
+def blocking_moves(boards, opponent):
+    """First empty cell per board that blocks opponent's win, or NO_MOVE"""
+    return winning_moves(boards, opponent)
+
+def analyze(boards, player=O):
+    """Winner, empty cells and immediate win/block moves for player on every board"""
+    return analyze_masks(*to_masks(boards), player)
+
+def analyze_masks(x_masks, o_masks, player=O):
+    """analyze() for boards already packed into per-player mask arrays"""
+    x_masks = np.asarray(x_masks, dtype=np.int16)
+    o_masks = np.asarray(o_masks, dtype=np.int16)
+    own_masks, other_masks = (x_masks, o_masks) if player == X else (o_masks, x_masks)
+    winning = _completion(own_masks, other_masks)
+    blocking = _completion(other_masks, own_masks)
+    return BatchAnalysis(
+        winner=_winners(x_masks, o_masks),
+        empty=~_unpack(x_masks | o_masks),
+        winning_mask=_unpack(winning),
+        blocking_mask=_unpack(blocking),
+        winning_move=FIRST_CELL_TABLE[winning],
+        blocking_move=FIRST_CELL_TABLE[blocking],
+    )
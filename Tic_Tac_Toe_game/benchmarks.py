@@ -0,0 +1,249 @@
+"""Repeatable benchmarks for the rules, AI and rendering hot paths
+
+Every case runs on positions drawn from a seeded random.Random, and the
+game's own random module is reseeded before each case, so two runs time
+exactly the same work. Results are compared against a saved baseline and
+any case slower than the threshold is reported as a regression (exit code 1).
+Rendering cases use SDL's dummy video driver, so no window is opened.
+
+    python benchmarks.py                       # run and compare with the baseline
+    python benchmarks.py --save-baseline       # record these numbers as the baseline
+    python benchmarks.py --filter minimax --threshold 0.1
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from game_engine import Difficulty, GameEngine, GameState, Player
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 0.20  # Fractional slowdown that counts as a regression
+DEFAULT_SEED = 1234
+MIN_REPEAT_TIME = 0.2  # Seconds each timed repeat runs for at least
+REPEATS = 5  # Timed repeats per case, the fastest one is reported
+POSITIONS = 32  # Distinct positions each case cycles through
+
+def random_positions(rng, count, stones, size=3, win_length=3):
+    """Return count non-terminal boards with the given number of stones, X to move when even"""
+    engine = GameEngine(size, win_length)
+    positions = []
+    while len(positions) < count:
+        engine.reset_game()
+        for _ in range(stones):
+            row, col = rng.choice(engine.get_empty_cells())
+            engine.make_move(row, col)
+            if engine.state != GameState.PLAYING:
+                break
+        else:
+            positions.append([row[:] for row in engine.board])
+    return positions
+
+def load_position(engine, board):
+    """Put board on engine as the live game, with the right player to move"""
+    engine.reset_game()
+    engine.board = [row[:] for row in board]
+    stones = sum(cell != '' for row in board for cell in row)
+    engine.current_player = Player.HUMAN if stones % 2 == 0 else Player.AI
+
+def cycle(items):
+    """Zero-argument callable returning the next item, round robin"""
+    state = {'index': 0}
+    def next_item():
+        item = items[state['index'] % len(items)]
+        state['index'] += 1
+        return item
+    return next_item
+
+def bench_check_winner(rng):
+    engine = GameEngine()
+    boards = cycle(random_positions(rng, POSITIONS, 5))
+    def run():
+        engine.board = boards()
+        engine.check_winner()
+    return run
+
+def bench_check_winner_board(rng):
+    engine = GameEngine()
+    boards = cycle(random_positions(rng, POSITIONS, 5))
+    return lambda: engine.check_winner_board(boards())
+
+def bench_find_fork_move(rng):
+    engine = GameEngine()
+    boards = cycle(random_positions(rng, POSITIONS, 3))
+    return lambda: engine.find_fork_move(boards(), 'O')
+
+def bench_minimax(stones):
+    def factory(rng):
+        # The transposition table is cleared on every call so each search is cold
+        engine = GameEngine()
+        boards = cycle(random_positions(rng, POSITIONS, stones))
+        def run():
+            engine.transposition_table.clear()
+            engine.minimax(boards(), 0, stones % 2 == 1)
+        return run
+    return factory
+
+def bench_ai_move(difficulty, size=3, win_length=3):
+    def factory(rng):
+        engine = GameEngine(size, win_length)
+        engine.difficulty = difficulty
+        # Time the search itself, with or without a solver.py table on disk
+        engine.use_solved_tables = False
+        boards = cycle(random_positions(rng, POSITIONS, 3, size, win_length))
+        def run():
+            load_position(engine, boards())
+            engine.transposition_table.clear()
+            engine.ai_strategic_move()
+        return run
+    return factory
+
+def bench_draw(method):
+    def factory(rng):
+        from python_tic_tac_toe import TicTacToe
+        game = TicTacToe()
+        game.difficulty = Difficulty.MEDIUM
+        boards = cycle(random_positions(rng, POSITIONS, 4))
+        def run():
+            game.board = boards()
+            game.state = GameState.PLAYING if method == 'draw_game' else GameState.GAME_OVER
+            game.winner = 'tie'
+            getattr(game, method)()
+        return run
+    return factory
+
+def bench_render(rng):
+    """One retained-mode frame of a move: a new stone, the status line and the timer"""
+    from python_tic_tac_toe import TicTacToe
+    game = TicTacToe()
+    game.difficulty = Difficulty.MEDIUM
+    game.reset_game()
+    game.render()
+    cells = cycle([divmod(cell, game.size) for cell in range(game.size * game.size)])
+    def run():
+        row, col = cells()
+        game.board[row][col] = 'X'
+        game.current_player = Player.AI if game.current_player == Player.HUMAN else Player.HUMAN
+        game.render()
+        # Take the stone back without a frame, so the next run is a single new stone again
+        game.board[row][col] = ''
+        game.rendered_board[row][col] = ''
+    return run
+
+BENCHMARKS = {
+    'check_winner': bench_check_winner,
+    'check_winner_board': bench_check_winner_board,
+    'find_fork_move': bench_find_fork_move,
+    'minimax_empty': bench_minimax(0),
+    'minimax_midgame': bench_minimax(4),
+    'ai_move_easy': bench_ai_move(Difficulty.EASY),
+    'ai_move_medium': bench_ai_move(Difficulty.MEDIUM),
+    'ai_move_hard': bench_ai_move(Difficulty.HARD),
+    'draw_game': bench_draw('draw_game'),
+    'draw_game_over': bench_draw('draw_game_over'),
+    'render_move': bench_render,
+}
+
+def time_case(run):
+    """Best microseconds per call over REPEATS timed repeats, garbage collector off like timeit"""
+    gc.collect()
+    gc.disable()
+    try:
+        return _time_case(run)
+    finally:
+        gc.enable()
+
+def _time_case(run):
+    # Calibrate the loop count so one repeat lasts at least MIN_REPEAT_TIME.
+    # Loops stay a multiple of POSITIONS so every repeat times each position
+    # equally often.
+    loops = POSITIONS
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_REPEAT_TIME:
+            break
+        loops *= 10 if elapsed < MIN_REPEAT_TIME / 10 else 2
+
+    best = elapsed
+    for _ in range(REPEATS - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        best = min(best, time.perf_counter() - start)
+    return best / loops * 1e6
+
+def run_benchmarks(names, seed=DEFAULT_SEED):
+    """Return {name: microseconds per call}"""
+    results = {}
+    for name in names:
+        random.seed(seed)
+        run = BENCHMARKS[name](random.Random(seed))
+        results[name] = time_case(run)
+        print(f"{name:<22}{results[name]:>12.2f} us", flush=True)
+    return results
+
+def compare(results, baseline, threshold):
+    """Print the change against baseline per case and return the names that regressed"""
+    regressions = []
+    print(f"\n{'case':<22}{'baseline us':>14}{'now us':>12}{'change':>10}")
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<22}{'-':>14}{now:>12.2f}{'new':>10}")
+            continue
+        change = now / before - 1
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<22}{before:>14.2f}{now:>12.2f}{change:>+10.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Tic Tac Toe rules, AI and rendering")
+    parser.add_argument('--filter', default='', help="only run cases whose name contains this")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store these results as the new baseline instead of comparing")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown fraction flagged as a regression (default: 0.20)")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = run_benchmarks(names, args.seed)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)['results']
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump({'seed': args.seed, 'results': baseline}, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+    with open(args.baseline) as f:
+        saved = json.load(f)
+    if saved.get('seed') != args.seed:
+        print(f"\nWarning: baseline was recorded with seed {saved.get('seed')}")
+    regressions = compare(results, saved['results'], args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) past {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
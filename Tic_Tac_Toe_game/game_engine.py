@@ -0,0 +1,1019 @@
+"""Tic Tac Toe rules, board state and AI, importable without pygame"""
+import operator
+import os
+import random
+import time
+from collections import OrderedDict, namedtuple
+from enum import Enum
+from functools import lru_cache, reduce
+
+# Game constants
+TIMER_DURATION = 10  # 10 seconds per turn
+AI_MOVE_DELAY = 3  # 3 seconds for AI to move
+TRANSPOSITION_TABLE_SIZE = 100000  # Max cached search positions
+LARGE_BOARD_SEARCH_DEPTH = 2  # Ply limit of the fixed-depth minimax() on boards bigger than 3x3
+SEARCH_TIME_FRACTION = 0.5  # Share of AI_MOVE_DELAY HARD may spend searching
+DEADLINE_CHECK_INTERVAL = 64  # Nodes searched between clock reads
+SOLVED_TABLE_CELLS = 16  # Boards up to 4x4 can have a solver.py perfect-play table
+MCTS_WORKERS = os.cpu_count() or 1  # Worker processes for MCTS searches; 1 searches in-process
+# Board variants offered in the menu: (size, win_length)
+BOARD_VARIANTS = ((3, 3), (4, 4), (5, 4), (15, 5))
+
+class GameState(Enum):
+    MENU = 1
+    PLAYING = 2
+    GAME_OVER = 3
+
+class Difficulty(Enum):
+    EASY = 1
+    MEDIUM = 2
+    HARD = 3
+    MCTS = 4
+
+class Player(Enum):
+    HUMAN = 1
+    AI = 2
+
+# Share of moves EASY and MEDIUM play at random instead of strategically
+RANDOM_MOVE_RATES = {Difficulty.EASY: 0.7, Difficulty.MEDIUM: 0.3}
+
+# Bitboard layout: cell (row, col) is bit row * size + col of a player's mask.
+# The classic 3x3 board gets precomputed 512-entry tables.
+FULL_MASK = 0b111111111
+WIN_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100,               # diagonals
+)
+# WINNING[mask] is True when the mask contains any of the 8 lines
+WINNING = tuple(any(mask & line == line for line in WIN_MASKS) for mask in range(FULL_MASK + 1))
+# CELLS[mask] lists the bit indices set in the mask, in row-major order
+CELLS = tuple(tuple(i for i in range(9) if mask >> i & 1) for mask in range(FULL_MASK + 1))
+
+def mask_cells(mask):
+    """List the bit indices set in mask, lowest first"""
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(low.bit_length() - 1)
+        mask ^= low
+    return cells
+
+def _symmetry_permutations(size):
+    """The 8 rotations and reflections of the board as cell index maps"""
+    cells = [divmod(i, size) for i in range(size * size)]
+    rotate = [c * size + (size - 1 - r) for r, c in cells]
+    reflect = [r * size + (size - 1 - c) for r, c in cells]
+    permutations = []
+    perm = list(range(size * size))
+    for _ in range(4):
+        permutations.append(perm)
+        permutations.append([reflect[p] for p in perm])
+        perm = [rotate[p] for p in perm]
+    return permutations
+
+# SYMMETRY_TABLES[s][mask] is the 3x3 mask transformed by symmetry s
+SYMMETRY_TABLES = tuple(
+    tuple(sum(1 << perm[i] for i in CELLS[mask]) for mask in range(FULL_MASK + 1))
+    for perm in _symmetry_permutations(3)
+)
+
+def canonical_key(x_mask, o_mask, is_maximizing):
+    """Key shared by every rotation/reflection of a 3x3 position"""
+    key = min(table[x_mask] << 9 | table[o_mask] for table in SYMMETRY_TABLES)
+    return key << 1 | is_maximizing
+
+class BoardGeometry:
+    """Cells, winning lines and symmetries of a size x size, k-in-a-row board"""
+    MAX_SYMMETRY_CELLS = 16  # Larger boards skip symmetry folding in the search cache
+
+    def __init__(self, size, win_length):
+        self.size = size
+        self.win_length = win_length
+        self.cell_count = size * size
+        self.full_mask = (1 << self.cell_count) - 1
+        self.win_score = self.cell_count + 1  # Score of a win at depth 0
+        self.classic = size == 3 and win_length == 3
+
+        # Every k-long window in each of the 4 directions
+        lines = []
+        for row in range(size):
+            for col in range(size):
+                for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_row = row + d_row * (win_length - 1)
+                    end_col = col + d_col * (win_length - 1)
+                    if 0 <= end_row < size and 0 <= end_col < size:
+                        lines.append(sum(1 << (row + d_row * s) * size + col + d_col * s
+                                         for s in range(win_length)))
+        self.line_masks = tuple(lines)
+        # Only the lines through the last stone can have just been completed
+        self.lines_through = tuple(
+            tuple(line for line in lines if line >> cell & 1) for cell in range(self.cell_count)
+        )
+        # The same, as indexes into line_masks
+        self.line_ids_through = tuple(
+            tuple(i for i, line in enumerate(lines) if line >> cell & 1) for cell in range(self.cell_count)
+        )
+        # reach[cell]: every other cell sharing a line with cell
+        self.reach = tuple(
+            reduce(operator.or_, self.lines_through[cell], 0) & ~(1 << cell)
+            for cell in range(self.cell_count)
+        )
+        # neighbours[cell]: the up to 8 surrounding cells
+        self.neighbours = tuple(
+            sum(1 << r * size + c
+                for r in range(max(0, row - 1), min(size, row + 2))
+                for c in range(max(0, col - 1), min(size, col + 2))
+                if (r, c) != (row, col))
+            for row, col in (divmod(cell, size) for cell in range(self.cell_count))
+        )
+        if self.cell_count <= self.MAX_SYMMETRY_CELLS:
+            self.symmetries = _symmetry_permutations(size)[1:]
+        else:
+            self.symmetries = []
+
+        # Open-line weights for the depth-limited heuristic, scaled into (-1, 1)
+        self.line_weights = tuple(4 ** stones - 1 for stones in range(win_length + 1))
+        self.heuristic_scale = len(lines) * 4 ** win_length + 1
+
+    def cells(self, mask):
+        return CELLS[mask] if self.classic else mask_cells(mask)
+
+    def has_win(self, mask):
+        """True if mask contains any complete line"""
+        if self.classic:
+            return WINNING[mask]
+        return any(mask & line == line for line in self.line_masks)
+
+    def wins_at(self, mask, cell):
+        """True if a line through cell is complete in mask, O(k) lines"""
+        if self.classic:
+            return WINNING[mask]
+        for line in self.lines_through[cell]:
+            if mask & line == line:
+                return True
+        return False
+
+    def winning_cells(self, own_mask, other_mask):
+        """Mask of empty cells that complete a line for own_mask"""
+        cells = 0
+        for i in self.cells(self.full_mask & ~(own_mask | other_mask)):
+            if self.wins_at(own_mask | 1 << i, i):
+                cells |= 1 << i
+        return cells
+
+    def winning_cell(self, own_mask, other_mask):
+        """Return the first empty cell index that completes a line for own_mask"""
+        for i in self.cells(self.full_mask & ~(own_mask | other_mask)):
+            if self.wins_at(own_mask | 1 << i, i):
+                return i
+        return None
+
+    def fork_cell(self, own_mask, other_mask):
+        """Return the first empty cell index that leaves own_mask with two winning cells"""
+        empty = self.full_mask & ~(own_mask | other_mask)
+        existing = self.winning_cells(own_mask, other_mask)
+        for i in self.cells(empty):
+            mask = own_mask | 1 << i
+            threats = existing & ~(1 << i)
+            # New winning cells can only appear on lines through i
+            for j in self.cells(self.reach[i] & empty & ~threats):
+                if self.wins_at(mask | 1 << j, j):
+                    threats |= 1 << j
+            if bin(threats).count('1') >= 2:
+                return i
+        return None
+
+    def candidate_moves(self, x_mask, o_mask):
+        """Empty cells worth searching; on large boards only those next to a stone"""
+        occupied = x_mask | o_mask
+        empty = self.full_mask & ~occupied
+        if self.size > 4:
+            if not occupied:
+                return [self.cell_count // 2]
+            near = 0
+            for i in mask_cells(occupied):
+                near |= self.neighbours[i]
+            empty &= near
+        return self.cells(empty)
+
+    def canonical_key(self, x_mask, o_mask, is_maximizing):
+        """Search cache key, folded over the board symmetries where affordable"""
+        if self.classic:
+            return canonical_key(x_mask, o_mask, is_maximizing)
+        key = x_mask << self.cell_count | o_mask
+        for perm in self.symmetries:
+            x_sym = sum(1 << perm[i] for i in mask_cells(x_mask))
+            o_sym = sum(1 << perm[i] for i in mask_cells(o_mask))
+            key = min(key, x_sym << self.cell_count | o_sym)
+        return key << 1 | is_maximizing
+
+    def evaluate(self, x_mask, o_mask):
+        """Heuristic in (-1, 1) from O's point of view, counting open lines"""
+        score = 0
+        weights = self.line_weights
+        # Lines with no stones on them score 0, so only visit lines through stones
+        lines = set()
+        for i in mask_cells(x_mask | o_mask):
+            lines.update(self.lines_through[i])
+        for line in lines:
+            if not line & x_mask:
+                score += weights[bin(line & o_mask).count('1')]
+            if not line & o_mask:
+                score -= weights[bin(line & x_mask).count('1')]
+        return score / self.heuristic_scale
+
+# Immutable game position: both bitboards, whose turn it is and the result.
+# Taking one is O(1); GameEngine.restore only touches the cells that differ.
+GameSnapshot = namedtuple('GameSnapshot', ['x_mask', 'o_mask', 'current_player', 'winner'])
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget runs out"""
+
+class SearchStats:
+    """Outcome of one iterative-deepening search (or MCTS move, with playouts as nodes)"""
+    def __init__(self, move, depth, nodes, seconds, completed):
+        self.move = move
+        self.depth = depth  # Deepest fully searched iteration, in plies
+        self.nodes = nodes
+        self.seconds = seconds
+        self.completed = completed  # True if the search proved the result
+        
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.seconds if self.seconds else 0.0
+        
+    def __repr__(self):
+        return (f"SearchStats(move={self.move}, depth={self.depth}, nodes={self.nodes}, "
+                f"nps={self.nodes_per_second:.0f}, completed={self.completed})")
+
+@lru_cache(maxsize=None)
+def get_geometry(size, win_length):
+    return BoardGeometry(size, win_length)
+
+class ThreatIndex:
+    """Per-line X and O stone counts, updated incrementally on every move and undo
+
+    A line holding win_length - 1 of one player's stones and none of the
+    other's has exactly one empty cell, and that cell wins for the player.
+    Those lines (threats) and the ones a stone short of them (builders) are
+    kept in sets, so winning, blocking and fork cells are read off a few
+    lines instead of trying every empty cell.
+    """
+    def __init__(self, geometry):
+        self.geometry = geometry
+        self.reset()
+        
+    def reset(self):
+        lines = len(self.geometry.line_masks)
+        self.counts = {'X': [0] * lines, 'O': [0] * lines}
+        self.masks = {'X': 0, 'O': 0}
+        self.threats = {'X': set(), 'O': set()}
+        # With two in a row, every empty line is one stone short of a threat
+        empty_lines = set(range(lines)) if self.geometry.win_length == 2 else set()
+        self.builders = {'X': set(empty_lines), 'O': set(empty_lines)}
+        
+    def sync(self, x_mask, o_mask):
+        """Catch up with a board that was changed without place/remove, one stone at a time"""
+        for mark, mask in (('X', x_mask), ('O', o_mask)):
+            for cell in mask_cells(self.masks[mark] & ~mask):
+                self.remove(mark, cell)
+        for mark, mask in (('X', x_mask), ('O', o_mask)):
+            for cell in mask_cells(mask & ~self.masks[mark]):
+                self.place(mark, cell)
+                
+    def place(self, mark, cell):
+        other = 'O' if mark == 'X' else 'X'
+        own, opposing = self.counts[mark], self.counts[other]
+        threats, builders = self.threats[mark], self.builders[mark]
+        threat = self.geometry.win_length - 1
+        self.masks[mark] |= 1 << cell
+        for line in self.geometry.line_ids_through[cell]:
+            count = own[line] = own[line] + 1
+            if count == 1:
+                # The line is now blocked for the other player
+                self.threats[other].discard(line)
+                self.builders[other].discard(line)
+            if opposing[line]:
+                continue
+            if count == threat:
+                builders.discard(line)
+                threats.add(line)
+            elif count == threat - 1:
+                builders.add(line)
+            elif count > threat:
+                threats.discard(line)  # Completed
+                
+    def remove(self, mark, cell):
+        other = 'O' if mark == 'X' else 'X'
+        own, opposing = self.counts[mark], self.counts[other]
+        threats, builders = self.threats[mark], self.builders[mark]
+        threat = self.geometry.win_length - 1
+        self.masks[mark] &= ~(1 << cell)
+        for line in self.geometry.line_ids_through[cell]:
+            count = own[line] = own[line] - 1
+            if count == 0:
+                # The line opens up again for the other player
+                if opposing[line] == threat:
+                    self.threats[other].add(line)
+                elif opposing[line] == threat - 1:
+                    self.builders[other].add(line)
+            if opposing[line]:
+                continue
+            if count == threat:
+                threats.add(line)
+            elif count == threat - 1:
+                threats.discard(line)
+                builders.add(line)
+            elif count == threat - 2:
+                builders.discard(line)
+                
+    def empty_mask(self):
+        return self.geometry.full_mask & ~(self.masks['X'] | self.masks['O'])
+        
+    def winning_cells(self, mark):
+        """Mask of empty cells that complete a line for mark"""
+        empty = self.empty_mask()
+        line_masks = self.geometry.line_masks
+        cells = 0
+        for line in self.threats[mark]:
+            cells |= line_masks[line] & empty
+        return cells
+        
+    def winning_cell(self, mark):
+        """Lowest empty cell index that completes a line for mark, or None"""
+        cells = self.winning_cells(mark)
+        return (cells & -cells).bit_length() - 1 if cells else None
+        
+    def fork_cell(self, mark):
+        """Lowest empty cell index that leaves mark with two winning cells, or None"""
+        empty = self.empty_mask()
+        line_masks = self.geometry.line_masks
+        builders = self.builders[mark]
+        existing = self.winning_cells(mark)
+        
+        # Only cells on a builder line add a threat; with two threats already
+        # every other empty cell keeps them
+        if bin(existing).count('1') >= 2:
+            candidates = empty
+        else:
+            candidates = 0
+            for line in builders:
+                candidates |= line_masks[line] & empty
+                
+        for i in self.geometry.cells(candidates):
+            bit = 1 << i
+            threats = existing & ~bit
+            for line in self.geometry.line_ids_through[i]:
+                if line in builders:
+                    threats |= line_masks[line] & empty & ~bit
+            if bin(threats).count('1') >= 2:
+                return i
+        return None
+
+class MonotonicClock:
+    """Real time for the turn timers, immune to wall-clock changes"""
+    def now(self):
+        return time.monotonic()
+
+class VirtualClock:
+    """Time that only moves when told to, for fast-forwarding timed games"""
+    def __init__(self, start=0.0):
+        self.time = start
+        
+    def now(self):
+        return self.time
+        
+    def advance(self, seconds):
+        self.time += seconds
+        
+    def advance_to(self, deadline):
+        self.time = max(self.time, deadline)
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry, counting hits and misses"""
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        
+    def __len__(self):
+        return len(self.entries)
+        
+    def get(self, key):
+        """The value cached for key, None on a miss"""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+        
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)  # Evict least recently used
+            
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+class TranspositionTable(LRUCache):
+    """Bounded LRU cache of minimax results with alpha-beta bound flags"""
+    EXACT = 0
+    LOWER = 1  # Stored value is a lower bound (search failed high)
+    UPPER = 2  # Stored value is an upper bound (search failed low)
+    
+    def __init__(self, max_entries=TRANSPOSITION_TABLE_SIZE):
+        super().__init__(max_entries)
+        
+    def store(self, key, flag, value, draft):
+        """Cache a result searched draft plies deep below the node"""
+        self.put(key, (flag, value, draft))
+
+def board_to_masks(board):
+    """Pack a list board into (x_mask, o_mask)"""
+    x_mask = o_mask = 0
+    bit = 1
+    for row in board:
+        for cell in row:
+            if cell == 'X':
+                x_mask |= bit
+            elif cell == 'O':
+                o_mask |= bit
+            bit <<= 1
+    return x_mask, o_mask
+
+class GameEngine:
+    """Board state, rules, turn timer and AI strategies for one game"""
+    def __init__(self, size=3, win_length=3, clock=None):
+        # Turn timers read this clock; the HARD search budget stays on real time
+        self.clock = clock or MonotonicClock()
+        
+        # Game state
+        self.state = GameState.MENU
+        self.difficulty = Difficulty.MEDIUM
+        self.current_player = Player.HUMAN
+        self.winner = None
+        
+        # Timer variables
+        self.turn_start_time = 0
+        self.time_remaining = TIMER_DURATION
+        self.auto_move_made = False
+        self.ai_move_timer = 0  # Timer for AI moves
+        
+        # The game's own random stream, reseeded from the game seed in reset_game
+        self.seed = None
+        self.rng = random.Random()
+        
+        # Search cache, kept across moves and games
+        self.transposition_table = TranspositionTable()
+        self.set_board_variant(size, win_length)
+        
+        # HARD think-time budget and the stats of the last search
+        self.search_time_budget = AI_MOVE_DELAY * SEARCH_TIME_FRACTION
+        self.search_deadline = None
+        self.cancel_event = None  # threading.Event that aborts the search when set
+        self.nodes_searched = 0
+        self.last_search = None
+        self.use_solved_tables = True  # HARD plays from a solver.py table when there is one
+        
+        # MCTS difficulty: searched by mcts.MCTSPlayer, created on its first move.
+        # mcts_playouts fixes the playouts per move instead of the time budget.
+        self.mcts = None
+        self.mcts_workers = MCTS_WORKERS
+        self.mcts_playouts = None
+        
+        # Game record: the seed above, start time and (cell, timed_out) moves.
+        # A recorder (game_record.GameRecordWriter) is handed every finished game.
+        self.started_at = 0  # Wall-clock time, for the record
+        self.game_start = 0  # self.clock time, for the game's duration
+        self.move_history = []
+        self.recorder = None
+        
+        # Undo/redo: snapshots taken before each move, and what undo took back
+        self.undo_stack = []
+        self.redo_stack = []  # (undone snapshots, position to return to, undone moves)
+
+    def set_board_variant(self, size, win_length):
+        """Switch to a size x size board with win_length in a row to win"""
+        self.size = size
+        self.win_length = win_length
+        self.geometry = get_geometry(size, win_length)
+        self.board = [['' for _ in range(size)] for _ in range(size)]
+        self.x_mask = self.o_mask = 0
+        self.threats = ThreatIndex(self.geometry)
+        self.transposition_table.clear()
+
+    @property
+    def search_depth(self):
+        """Ply limit of minimax(), None to search to the end of the game
+
+        Only the fixed-depth minimax() path uses it; HARD itself deepens
+        iteratively under search_time_budget (iterative_deepening_move).
+        """
+        return None if self.geometry.cell_count <= 9 else LARGE_BOARD_SEARCH_DEPTH
+        
+    def reset_game(self, seed=None):
+        # Seed the engine's own generator per game so a recorded seed replays
+        # the AI's choices without touching the random module's global state
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.rng.seed(self.seed)
+        self.started_at = time.time()
+        self.game_start = self.clock.now()
+        self.move_history = []
+        self.undo_stack = []
+        self.redo_stack = []
+        
+        self.board = [['' for _ in range(self.size)] for _ in range(self.size)]
+        self.x_mask = self.o_mask = 0
+        self.threats.reset()
+        self.current_player = Player.HUMAN
+        self.winner = None
+        self.state = GameState.PLAYING
+        self.turn_start_time = self.clock.now()
+        self.time_remaining = TIMER_DURATION
+        self.auto_move_made = False
+        self.ai_move_timer = 0
+        
+    def make_move(self, row, col, timed_out=False):
+        """Place the current player's mark and hand the turn over
+
+        timed_out marks the timer's random auto-move in the game record.
+        """
+        cell = row * self.size + col
+        self.undo_stack.append(self.snapshot())
+        self.redo_stack.clear()
+        self.move_history.append((cell, timed_out))
+        if self.current_player == Player.HUMAN:
+            self.board[row][col] = 'X'
+            self.x_mask |= 1 << cell
+            mask = self.x_mask
+        else:
+            self.board[row][col] = 'O'
+            self.o_mask |= 1 << cell
+            mask = self.o_mask
+        self.threats.place(self.board[row][col], cell)
+        
+        # Check for winner, only along the lines through the new stone
+        if self.geometry.wins_at(mask, cell):
+            winner = self.board[row][col]
+        elif self.x_mask | self.o_mask == self.geometry.full_mask:
+            winner = 'tie'
+        else:
+            winner = None
+
+        if winner:
+            self.winner = winner
+            self.state = GameState.GAME_OVER
+            if self.recorder is not None:
+                self.recorder.record(self)
+        elif self.current_player == Player.HUMAN:
+            # Switch to AI turn
+            self.current_player = Player.AI
+            self.ai_move_timer = self.clock.now()
+            self.on_ai_turn()
+        else:
+            # Switch to human turn
+            self.current_player = Player.HUMAN
+            self.turn_start_time = self.clock.now()
+            self.time_remaining = TIMER_DURATION
+            self.auto_move_made = False
+        return winner
+        
+    def snapshot(self):
+        return GameSnapshot(self.x_mask, self.o_mask, self.current_player, self.winner)
+        
+    def restore(self, snapshot):
+        """Return to a snapshot, rewriting only the board cells that differ"""
+        changed = (self.x_mask ^ snapshot.x_mask) | (self.o_mask ^ snapshot.o_mask)
+        for cell in self.geometry.cells(changed):
+            row, col = divmod(cell, self.size)
+            if snapshot.x_mask >> cell & 1:
+                self.board[row][col] = 'X'
+            elif snapshot.o_mask >> cell & 1:
+                self.board[row][col] = 'O'
+            else:
+                self.board[row][col] = ''
+        self.x_mask, self.o_mask = snapshot.x_mask, snapshot.o_mask
+        self.threats.sync(self.x_mask, self.o_mask)
+        self.current_player = snapshot.current_player
+        self.winner = snapshot.winner
+        self.state = GameState.GAME_OVER if snapshot.winner else GameState.PLAYING
+        
+    def restart_turn(self):
+        """Start the clock for whoever is to move, as if the turn had just begun"""
+        if self.state != GameState.PLAYING:
+            return
+        if self.current_player == Player.HUMAN:
+            self.turn_start_time = self.clock.now()
+            self.time_remaining = TIMER_DURATION
+            self.auto_move_made = False
+        else:
+            self.ai_move_timer = self.clock.now()
+            self.on_ai_turn()
+            
+    def undo(self):
+        """Take back moves up to the human's previous turn, False if there is nothing to undo"""
+        if not self.undo_stack:
+            return False
+        current = self.snapshot()
+        undone = [self.undo_stack.pop()]
+        while undone[-1].current_player != Player.HUMAN and self.undo_stack:
+            undone.append(self.undo_stack.pop())
+        moves = len(self.move_history) - len(undone)
+        self.redo_stack.append((undone, current, self.move_history[moves:]))
+        del self.move_history[moves:]
+        self.restore(undone[-1])
+        self.restart_turn()
+        return True
+        
+    def redo(self):
+        """Replay what the last undo took back, False if there is nothing to redo"""
+        if not self.redo_stack:
+            return False
+        undone, position, moves = self.redo_stack.pop()
+        self.undo_stack.extend(reversed(undone))
+        self.move_history.extend(moves)
+        self.restore(position)
+        self.restart_turn()
+        return True
+        
+    def check_winner(self):
+        x_mask, o_mask = board_to_masks(self.board)
+        winner = self.masks_winner(x_mask, o_mask)
+        if winner:
+            return winner
+        
+        # Check for tie
+        if x_mask | o_mask == self.geometry.full_mask:
+            return 'tie'
+            
+        return None
+        
+    def masks_winner(self, x_mask, o_mask):
+        """Return 'X', 'O' or None for a pair of player masks"""
+        if self.geometry.has_win(x_mask):
+            return 'X'
+        if self.geometry.has_win(o_mask):
+            return 'O'
+        return None
+
+    def get_empty_cells(self):
+        x_mask, o_mask = board_to_masks(self.board)
+        empty = self.geometry.full_mask & ~(x_mask | o_mask)
+        return [divmod(i, self.size) for i in self.geometry.cells(empty)]
+        
+    def evaluate_position(self, board, player):
+        """Evaluate the current board position"""
+        winner = self.check_winner_board(board)
+        if winner == player:
+            return 100
+        elif winner and winner != player:
+            return -100
+        else:
+            return 0
+            
+    def minimax(self, board, depth, is_maximizing, alpha=float('-inf'), beta=float('inf')):
+        x_mask, o_mask = board_to_masks(board)
+        return self.minimax_masks(x_mask, o_mask, depth, is_maximizing, alpha, beta,
+                                  self.search_depth)
+        
+    def minimax_masks(self, x_mask, o_mask, depth, is_maximizing, alpha=float('-inf'),
+                      beta=float('inf'), max_depth=None, last_move=None):
+        """Bitboard minimax: 'O' maximizes, 'X' minimizes
+
+        Wins score win_score - depth, so faster wins rank higher. When
+        max_depth cuts the search off, the open-line heuristic (always
+        strictly between -1 and 1) stands in for the result. last_move
+        limits the win check to the lines through that cell.
+        """
+        self.nodes_searched += 1
+        if self.nodes_searched % DEADLINE_CHECK_INTERVAL == 0 and self.search_should_stop():
+            raise SearchTimeout
+            
+        geometry = self.geometry
+        if last_move is None:
+            if geometry.has_win(o_mask):  # AI wins
+                return geometry.win_score - depth
+            elif geometry.has_win(x_mask):  # Human wins
+                return depth - geometry.win_score
+        elif is_maximizing:
+            if geometry.wins_at(x_mask, last_move):  # Human wins
+                return depth - geometry.win_score
+        elif geometry.wins_at(o_mask, last_move):  # AI wins
+            return geometry.win_score - depth
+        if x_mask | o_mask == geometry.full_mask:  # Tie
+            return 0
+            
+        if max_depth is None:
+            draft = geometry.cell_count
+        elif depth >= max_depth:
+            return geometry.evaluate(x_mask, o_mask)
+        else:
+            draft = max_depth - depth
+
+        # Win scores are stored relative to this node so they can be reused at any depth
+        key = geometry.canonical_key(x_mask, o_mask, is_maximizing)
+        entry = self.transposition_table.get(key)
+        if entry and entry[2] >= draft:
+            flag, value, _ = entry
+            value = value - depth if value >= 1 else value + depth if value <= -1 else value
+            if flag == TranspositionTable.EXACT:
+                return value
+            elif flag == TranspositionTable.LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if beta <= alpha:
+                return value
+        alpha_orig, beta_orig = alpha, beta
+            
+        moves = geometry.candidate_moves(x_mask, o_mask)
+        if is_maximizing:
+            best_eval = float('-inf')
+            for i in moves:
+                eval_score = self.minimax_masks(x_mask, o_mask | 1 << i, depth + 1, False,
+                                                alpha, beta, max_depth, i)
+                best_eval = max(best_eval, eval_score)
+                alpha = max(alpha, eval_score)
+                if beta <= alpha:
+                    break
+        else:
+            best_eval = float('inf')
+            for i in moves:
+                eval_score = self.minimax_masks(x_mask | 1 << i, o_mask, depth + 1, True,
+                                                alpha, beta, max_depth, i)
+                best_eval = min(best_eval, eval_score)
+                beta = min(beta, eval_score)
+                if beta <= alpha:
+                    break
+                    
+        if best_eval <= alpha_orig:
+            flag = TranspositionTable.UPPER
+        elif best_eval >= beta_orig:
+            flag = TranspositionTable.LOWER
+        else:
+            flag = TranspositionTable.EXACT
+        if best_eval >= 1:
+            stored = best_eval + depth
+        elif best_eval <= -1:
+            stored = best_eval - depth
+        else:
+            stored = best_eval
+        self.transposition_table.store(key, flag, stored, draft)
+        return best_eval
+            
+    def search_move(self, x_mask, o_mask, mark, max_depth=None, moves=None):
+        """Best (cell, score) for mark by minimax, first one in moves on ties"""
+        best_score = float('-inf')
+        best_move = None
+        if moves is None:
+            moves = self.geometry.candidate_moves(x_mask, o_mask)
+        # Scores are from O's point of view, so X negates them
+        for i in moves:
+            if mark == 'O':
+                score = self.minimax_masks(x_mask, o_mask | 1 << i, 0, False,
+                                           best_score, float('inf'), max_depth, i)
+            else:
+                score = -self.minimax_masks(x_mask | 1 << i, o_mask, 0, True,
+                                            float('-inf'), -best_score, max_depth, i)
+            if score > best_score:
+                best_score = score
+                best_move = i
+        return best_move, best_score
+        
+    def search_should_stop(self):
+        """True once the time budget is spent or the search was cancelled"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return True
+        return self.search_deadline is not None and time.perf_counter() >= self.search_deadline
+        
+    def iterative_deepening_move(self, x_mask, o_mask, mark, time_budget=None):
+        """Deepen the search one ply at a time until time_budget seconds run out
+
+        Each iteration searches the previous iteration's best move first and
+        the move of the last completed iteration is returned, so a result is
+        always available. Stats are kept in self.last_search.
+        """
+        if time_budget is None:
+            time_budget = self.search_time_budget
+        start = time.perf_counter()
+        self.search_deadline = start + time_budget
+        self.nodes_searched = 0
+        
+        moves = list(self.geometry.candidate_moves(x_mask, o_mask))
+        best_move = moves[0] if moves else None
+        empties = self.geometry.cell_count - bin(x_mask | o_mask).count('1')
+        depth = 0
+        completed = False
+        try:
+            for plies in range(1, empties + 1):
+                move, score = self.search_move(x_mask, o_mask, mark, plies - 1, moves)
+                best_move, depth = move, plies
+                moves.remove(move)
+                moves.insert(0, move)
+                # Stop once the game is searched to the end or a win/loss is proven
+                if plies == empties or abs(score) >= 1:
+                    completed = True
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.search_deadline = None
+            
+        self.last_search = SearchStats(best_move, depth, self.nodes_searched,
+                                       time.perf_counter() - start, completed)
+        return best_move
+
+    def solved_table(self):
+        """The memory-mapped solver.py table for this variant, None if it has not been solved"""
+        if not self.use_solved_tables or self.geometry.cell_count > SOLVED_TABLE_CELLS:
+            return None
+        from solver import load_table
+        return load_table(self.size, self.win_length)
+        
+    def mcts_move(self, x_mask, o_mask, mark):
+        """Best cell for mark by MCTS within mcts_playouts or the search time budget"""
+        if self.mcts is None or self.mcts.workers != self.mcts_workers:
+            from mcts import MCTSPlayer
+            self.close()
+            self.mcts = MCTSPlayer(self.mcts_workers)
+        time_budget = None if self.mcts_playouts else self.search_time_budget
+        move = self.mcts.search(self.geometry, x_mask, o_mask, mark, self.mcts_playouts, time_budget,
+                                self.cancel_event)
+        stats = self.mcts.last_search
+        self.nodes_searched = stats.playouts
+        self.last_search = SearchStats(move, 0, stats.playouts, stats.seconds, False)
+        return move
+        
+    def close(self):
+        """Stop the MCTS worker processes, if any were started"""
+        if self.mcts is not None:
+            self.mcts.close()
+            self.mcts = None
+        
+    def check_winner_board(self, board):
+        return self.masks_winner(*board_to_masks(board))
+        
+    def is_board_full_board(self, board):
+        x_mask, o_mask = board_to_masks(board)
+        return x_mask | o_mask == self.geometry.full_mask
+        
+    def find_winning_move(self, board, player):
+        """Find a move that wins the game immediately"""
+        x_mask, o_mask = board_to_masks(board)
+        if player == 'X':
+            cell = self.geometry.winning_cell(x_mask, o_mask)
+        else:
+            cell = self.geometry.winning_cell(o_mask, x_mask)
+        return divmod(cell, self.size) if cell is not None else None
+        
+    def find_blocking_move(self, board, opponent):
+        """Find a move that blocks opponent from winning"""
+        return self.find_winning_move(board, opponent)
+        
+    def find_fork_move(self, board, player):
+        """Find a move that creates two winning opportunities"""
+        x_mask, o_mask = board_to_masks(board)
+        if player == 'X':
+            cell = self.geometry.fork_cell(x_mask, o_mask)
+        else:
+            cell = self.geometry.fork_cell(o_mask, x_mask)
+        return divmod(cell, self.size) if cell is not None else None
+        
+    def ai_strategic_move(self, mark='O', rng=None):
+        """Enhanced AI strategy based on difficulty, playing as mark
+
+        Random choices are drawn from rng, the game's self.rng unless a
+        caller (see policy.py) passes its own seeded random.Random.
+        """
+        rng = self.rng if rng is None else rng
+        opponent = 'X' if mark == 'O' else 'O'
+        empty_cells = self.get_empty_cells()
+        
+        # Easy mode - mostly random with some basic strategy
+        if self.difficulty == Difficulty.EASY:
+            if rng.random() < RANDOM_MOVE_RATES[Difficulty.EASY]:  # 70% random
+                return rng.choice(empty_cells)
+        
+        # Medium mode - good strategy with some randomness
+        elif self.difficulty == Difficulty.MEDIUM:
+            if rng.random() < RANDOM_MOVE_RATES[Difficulty.MEDIUM]:  # 30% random
+                return rng.choice(empty_cells)
+        
+        # Strategic play for medium and hard modes
+        x_mask, o_mask = board_to_masks(self.board)
+        
+        # Hard mode on a solved variant - look the perfect move up instead of searching
+        if self.difficulty == Difficulty.HARD:
+            table = self.solved_table()
+            if table is not None:
+                cell = table.best_move(x_mask, o_mask)
+                if cell is not None:
+                    return divmod(cell, self.size)
+                    
+        threats = self.threats
+        threats.sync(x_mask, o_mask)  # No-op unless the board was set directly
+        
+        # 1. Try to win immediately
+        winning_cell = threats.winning_cell(mark)
+        if winning_cell is not None:
+            return divmod(winning_cell, self.size)
+            
+        # 2. Block opponent from winning
+        blocking_cell = threats.winning_cell(opponent)
+        if blocking_cell is not None:
+            return divmod(blocking_cell, self.size)
+            
+        # 3. Hard and MCTS modes - create a fork, otherwise play the searched move
+        if self.difficulty in (Difficulty.HARD, Difficulty.MCTS):
+            fork_cell = threats.fork_cell(mark)
+            if fork_cell is not None:
+                return divmod(fork_cell, self.size)
+                
+            # The search also covers blocking the opponent's forks
+            if self.difficulty == Difficulty.MCTS:
+                best_move = self.mcts_move(x_mask, o_mask, mark)
+            else:
+                best_move = self.iterative_deepening_move(x_mask, o_mask, mark)
+            return divmod(best_move, self.size) if best_move is not None else rng.choice(empty_cells)
+        
+        return self.positional_move(x_mask, o_mask, rng)
+        
+    def positional_move(self, x_mask, o_mask, rng=None):
+        """Steps 4-6 of ai_strategic_move, for when there is nothing to win or block"""
+        rng = self.rng if rng is None else rng
+        # 4. Take center if available
+        center = self.size // 2
+        if self.board[center][center] == '':
+            return (center, center)
+            
+        # 5. Take corners (strategic positions)
+        last = self.size - 1
+        if self.size == 3:
+            corners = [(0, 0), (0, last), (last, 0), (last, last)]
+            available_corners = [(i, j) for i, j in corners if self.board[i][j] == '']
+            if available_corners:
+                return rng.choice(available_corners)
+        else:
+            # Corners are weak on bigger boards, play next to existing stones instead
+            nearby = self.geometry.candidate_moves(x_mask, o_mask)
+            if nearby:
+                return divmod(rng.choice(nearby), self.size)
+            
+        # 6. Take any remaining cell (the sides on 3x3)
+        empty_cells = self.get_empty_cells()
+        if empty_cells:
+            return rng.choice(empty_cells)
+            
+        # Fallback
+        return None
+        
+    def on_ai_turn(self):
+        """Called when the turn passes to the AI; front ends may start thinking early"""
+        
+    def take_ai_move(self):
+        """The AI's move once AI_MOVE_DELAY is up, or None if it is not ready yet"""
+        return self.ai_strategic_move()
+        
+    def next_deadline(self):
+        """Clock time at which update_timer next acts on its own, None when no game is running"""
+        if self.state != GameState.PLAYING or self.winner:
+            return None
+        if self.current_player == Player.HUMAN:
+            return self.turn_start_time + TIMER_DURATION
+        return self.ai_move_timer + AI_MOVE_DELAY
+        
+    def update_timer(self):
+        """Update the timer and handle automatic moves"""
+        if self.state != GameState.PLAYING or self.winner:
+            return
+            
+        current_time = self.clock.now()
+        
+        if self.current_player == Player.HUMAN:
+            # Timer only runs for human player. Compared against the same
+            # sum next_deadline returns, so a clock advanced to it times out.
+            self.time_remaining = max(0, self.turn_start_time + TIMER_DURATION - current_time)
+            
+            # Time's up - make random move for human
+            if self.time_remaining <= 0 and not self.auto_move_made:
+                self.auto_move_made = True
+                empty_cells = self.get_empty_cells()
+                
+                if empty_cells:
+                    row, col = self.rng.choice(empty_cells)
+                    self.make_move(row, col, timed_out=True)
+                        
+        else:  # AI turn
+            # AI moves after 3 seconds
+            if current_time >= self.ai_move_timer + AI_MOVE_DELAY:
+                move = self.take_ai_move()
+                if move:
+                    row, col = move
+                    self.make_move(row, col)
@@ -0,0 +1,184 @@
+"""Compact binary game records: streaming writer, mmap reader and replay
+
+A record file is RECORD_MAGIC followed by back-to-back records, so games
+can be appended forever and read back one at a time without loading the
+file. Each record is:
+
+    RECORD_HEADER   size, win_length, difficulty, move count, winner,
+                    seed, start time, duration in milliseconds (25 bytes)
+    timeout bitset  one bit per move, set when update_timer auto-moved
+    moves           cell indexes, two per byte (4-bit nibbles) on boards
+                    of up to 16 cells, one per byte on bigger boards
+
+A full 3x3 game takes 32 bytes.
+
+    python game_record.py games.ttt             # summarize a record file
+    python game_record.py games.ttt --replay    # re-play every game headless
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+
+from game_engine import Difficulty, GameEngine
+
+RECORD_MAGIC = b'TTTR\x01'
+RECORD_HEADER = struct.Struct('<BBBBBQdI')
+WINNER_CODES = {None: 0, 'X': 1, 'O': 2, 'tie': 3}
+WINNERS = {code: winner for winner, code in WINNER_CODES.items()}
+NIBBLE_CELLS = 16  # Boards with at most this many cells pack moves into nibbles
+
+class GameRecord:
+    """One finished (or abandoned) game: variant, settings and the moves played"""
+    def __init__(self, size, win_length, difficulty, seed, started, duration, moves, timeouts, winner):
+        self.size = size
+        self.win_length = win_length
+        self.difficulty = difficulty
+        self.seed = seed
+        self.started = started  # Unix time the game started
+        self.duration = duration  # Seconds from start to the last move
+        self.moves = moves  # Cell indexes (row * size + col) in play order
+        self.timeouts = timeouts  # Per move: True when it was a timeout auto-move
+        self.winner = winner  # 'X', 'O', 'tie' or None
+
+    @classmethod
+    def from_engine(cls, engine):
+        """Record the game currently on engine"""
+        return cls(engine.size, engine.win_length, engine.difficulty, engine.seed,
+                   engine.started_at, engine.clock.now() - engine.game_start,
+                   [cell for cell, _ in engine.move_history],
+                   [timed_out for _, timed_out in engine.move_history], engine.winner)
+
+    def __repr__(self):
+        return (f"GameRecord({self.size}x{self.size}/{self.win_length}, {self.difficulty.name}, "
+                f"{len(self.moves)} moves, winner={self.winner})")
+
+def encode_record(record):
+    """Serialize a GameRecord to bytes"""
+    count = len(record.moves)
+    header = RECORD_HEADER.pack(record.size, record.win_length, record.difficulty.value, count,
+                                WINNER_CODES[record.winner], record.seed or 0, record.started,
+                                int(record.duration * 1000))
+    timeouts = sum(1 << i for i, timed_out in enumerate(record.timeouts) if timed_out)
+    if record.size * record.size <= NIBBLE_CELLS:
+        moves = bytes((record.moves[i] | (record.moves[i + 1] << 4 if i + 1 < count else 0))
+                      for i in range(0, count, 2))
+    else:
+        moves = bytes(record.moves)
+    return header + timeouts.to_bytes((count + 7) // 8, 'little') + moves
+
+def decode_record(buffer, offset):
+    """Parse the record at offset in buffer, returns (GameRecord, offset of the next record)"""
+    size, win_length, difficulty, count, winner, seed, started, duration = \
+        RECORD_HEADER.unpack_from(buffer, offset)
+    offset += RECORD_HEADER.size
+    timeout_bytes = (count + 7) // 8
+    timeouts = int.from_bytes(buffer[offset:offset + timeout_bytes], 'little')
+    offset += timeout_bytes
+    if size * size <= NIBBLE_CELLS:
+        packed = buffer[offset:offset + (count + 1) // 2]
+        moves = [(packed[i // 2] >> (4 * (i % 2))) & 0xF for i in range(count)]
+        offset += len(packed)
+    else:
+        moves = list(buffer[offset:offset + count])
+        offset += count
+    record = GameRecord(size, win_length, Difficulty(difficulty), seed, started, duration / 1000,
+                        moves, [bool(timeouts >> i & 1) for i in range(count)], WINNERS[winner])
+    return record, offset
+
+class GameRecordWriter:
+    """Appends records to a file, writing the magic header if the file is new"""
+    def __init__(self, path):
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(RECORD_MAGIC)
+
+    def write(self, record):
+        self.file.write(encode_record(record))
+
+    def write_encoded(self, data):
+        """Append records already serialized with encode_record"""
+        self.file.write(data)
+
+    def record(self, engine):
+        """Append the game currently on engine and flush it to disk"""
+        self.write(GameRecord.from_engine(engine))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def read_records(path):
+    """Yield every GameRecord in a record file, memory-mapped rather than read into memory"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size <= len(RECORD_MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if buffer[:len(RECORD_MAGIC)] != RECORD_MAGIC:
+                raise ValueError(f"{path} is not a game record file")
+            offset = len(RECORD_MAGIC)
+            while offset < len(buffer):
+                record, offset = decode_record(buffer, offset)
+                yield record
+
+def replay(record, engine):
+    """Play record's moves on engine, yielding after each one
+
+    The engine is switched to the record's board variant and difficulty and
+    reset with its seed; no AI moves or timers run, only make_move.
+    """
+    if (engine.size, engine.win_length) != (record.size, record.win_length):
+        engine.set_board_variant(record.size, record.win_length)
+    engine.difficulty = record.difficulty
+    engine.reset_game(record.seed)
+    for cell, timed_out in zip(record.moves, record.timeouts):
+        row, col = divmod(cell, record.size)
+        engine.make_move(row, col, timed_out)
+        yield row, col
+
+def replay_all(path):
+    """Re-play every record headless at full speed, returns (games, mismatched winners, seconds)"""
+    engine = GameEngine()
+    games = mismatches = 0
+    start = time.perf_counter()
+    for record in read_records(path):
+        for _ in replay(record, engine):
+            pass
+        games += 1
+        if engine.winner != record.winner:
+            mismatches += 1
+    return games, mismatches, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize or replay a Tic Tac Toe game record file")
+    parser.add_argument('path')
+    parser.add_argument('--replay', action='store_true',
+                        help="re-play every game headless and check the recorded winners")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        games, mismatches, seconds = replay_all(args.path)
+        print(f"Replayed {games} games in {seconds:.2f}s ({games / max(seconds, 1e-9):.0f} games/s), "
+              f"{mismatches} winner mismatches")
+        return
+
+    games = moves = timeouts = 0
+    winners = dict.fromkeys(WINNER_CODES, 0)
+    for record in read_records(args.path):
+        games += 1
+        moves += len(record.moves)
+        timeouts += sum(record.timeouts)
+        winners[record.winner] += 1
+    print(f"{games} games, {moves} moves ({moves / max(games, 1):.1f} per game), {timeouts} timeout moves")
+    print(f"X {winners['X']}  O {winners['O']}  tie {winners['tie']}  unfinished {winners[None]}")
+    print(f"{os.path.getsize(args.path)} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""Asyncio server hosting many timed human-vs-AI games, plus a load generator
+
+Every game keeps the desktop rules: TIMER_DURATION per human turn with a
+random auto-move on timeout, and the AI answering AI_MOVE_DELAY after the
+human moved. Instead of each game polling the clock like update_timer,
+all sessions share one DeadlineScheduler: a heap of deadlines behind a
+single event-loop timer armed for the earliest one. AI turns that come up
+in the same loop iteration are sent to a process pool together, as
+policy.choose_moves batches, so they neither block the event loop nor
+share one GIL, and a busy server pays one pool round trip per batch
+rather than per move.
+
+The protocol is JSON lines over TCP. Requests:
+
+    {"op": "new", "difficulty": "HARD", "size": 3, "win_length": 3}
+    {"op": "move", "game": 1, "row": 0, "col": 2}
+    {"op": "stats"}
+
+Events carry the game id, the board as a row-major string of 'X', 'O' and
+'.', and whose turn is next ("X", "O" or null once the game is over):
+
+    {"event": "started", "game": 1, "board": ".........", "turn": "X"}
+    {"event": "move", "game": 1, "player": "X", "row": 0, "col": 2,
+     "timed_out": false, "board": "..X......", "turn": "O"}
+    {"event": "over", "game": 1, "winner": "X" | "O" | "tie", ...}
+    {"event": "stats", ...} / {"event": "error", "message": "..."}
+
+    python game_server.py serve --port 8765
+    python game_server.py load --sessions 1000 --games 5    # against a running server
+"""
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from game_engine import AI_MOVE_DELAY, TIMER_DURATION, Difficulty, GameEngine, GameState, Player
+from policy import choose_moves
+from profiler import percentile
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+class DeadlineScheduler:
+    """Deadline heap shared by every session, served by one event-loop timer
+
+    Entries are [deadline, sequence, callback] lists; cancelling clears the
+    callback and the entry is dropped when it reaches the top of the heap.
+    Deadlines are in loop.time() seconds.
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self.heap = []
+        self.sequence = itertools.count()
+        self.handle = None  # Loop timer for heap[0]
+        self.armed_for = None
+
+    def call_at(self, deadline, callback):
+        entry = [deadline, next(self.sequence), callback]
+        heapq.heappush(self.heap, entry)
+        if self.armed_for is None or deadline < self.armed_for:
+            self._arm()
+        return entry
+
+    def call_later(self, delay, callback):
+        return self.call_at(self.loop.time() + delay, callback)
+
+    @staticmethod
+    def cancel(entry):
+        if entry is not None:
+            entry[2] = None
+
+    def _arm(self):
+        if self.handle is not None:
+            self.handle.cancel()
+        if self.heap:
+            self.armed_for = self.heap[0][0]
+            self.handle = self.loop.call_at(self.armed_for, self._fire)
+        else:
+            self.armed_for = self.handle = None
+
+    def _fire(self):
+        now = self.loop.time()
+        while self.heap and self.heap[0][0] <= now:
+            _, _, callback = heapq.heappop(self.heap)
+            if callback is not None:
+                callback()
+        self._arm()
+
+def json_int(value):
+    """value if it is a JSON integer, else ValueError (true, 1.0 and 1e999 included)"""
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"not an integer: {value!r}")
+    return value
+
+def uses_full_budget(difficulty_value, size):
+    """Whether the AI spends its whole think time per move: MCTS always, HARD past 3x3"""
+    difficulty = Difficulty(difficulty_value)
+    return difficulty == Difficulty.MCTS or (difficulty == Difficulty.HARD and size > 3)
+
+def search_moves(requests, size, win_length):
+    """Executor entry point: the AI's (row, col) per (board, difficulty value, seed)"""
+    return choose_moves([(board, Difficulty(value), seed) for board, value, seed in requests],
+                        size, win_length)
+
+class GameSession(GameEngine):
+    """One game driven by the shared scheduler instead of update_timer"""
+    def __init__(self, server, game_id, send, size, win_length, difficulty):
+        super().__init__(size, win_length)
+        self.server = server
+        self.game_id = game_id
+        self.send = send
+        self.difficulty = difficulty
+        self.timer = None  # Scheduler entry of the pending timeout or AI reply
+        self.ai_future = None
+        self.closed = False
+
+    def board_text(self):
+        return ''.join(cell or '.' for row in self.board for cell in row)
+
+    def event(self, name, **fields):
+        if self.state == GameState.PLAYING:
+            turn = 'X' if self.current_player == Player.HUMAN else 'O'
+        else:
+            turn = None
+        self.send(dict(event=name, game=self.game_id, **fields, board=self.board_text(), turn=turn))
+
+    def start(self):
+        self.reset_game()
+        self.event('started')
+        self.start_human_turn()
+
+    def start_human_turn(self):
+        self.timer = self.server.scheduler.call_later(self.server.turn_time, self.on_timeout)
+
+    def on_timeout(self):
+        # Time's up - make random move for human
+        row, col = self.rng.choice(self.get_empty_cells())
+        self.play(row, col, timed_out=True)
+
+    def human_move(self, row, col):
+        """Apply a move from the client, returns an error message or None"""
+        if self.state != GameState.PLAYING or self.current_player != Player.HUMAN:
+            return "not your turn"
+        if not (0 <= row < self.size and 0 <= col < self.size) or self.board[row][col] != '':
+            return "illegal move"
+        self.server.scheduler.cancel(self.timer)
+        self.play(row, col)
+        return None
+
+    def play(self, row, col, timed_out=False):
+        player = 'X' if self.current_player == Player.HUMAN else 'O'
+        self.make_move(row, col, timed_out)
+        self.event('move', player=player, row=row, col=col, timed_out=timed_out)
+        if self.state == GameState.GAME_OVER:
+            self.event('over', winner=self.winner)
+            self.close()
+        elif self.current_player == Player.HUMAN:
+            self.start_human_turn()
+
+    def on_ai_turn(self):
+        # Search right away in the pool; the reply is due after the AI delay
+        self.ai_future = self.server.request_ai_move(self, self.rng.getrandbits(32))
+        self.timer = self.server.scheduler.call_later(self.server.ai_delay, self.on_ai_deadline)
+
+    def on_ai_deadline(self):
+        if self.ai_future.done():
+            self.on_ai_result(self.ai_future)
+        else:
+            self.ai_future.add_done_callback(self.on_ai_result)
+
+    def on_ai_result(self, future):
+        if not self.closed and not future.cancelled():
+            self.play(*future.result())
+
+    def close(self):
+        self.closed = True
+        self.server.scheduler.cancel(self.timer)
+        self.server.sessions.pop(self.game_id, None)
+        self.server.games_finished += self.winner is not None
+
+class GameServer:
+    """Accepts JSON-lines connections and hosts any number of sessions on each"""
+    def __init__(self, turn_time=TIMER_DURATION, ai_delay=AI_MOVE_DELAY, ai_workers=None):
+        self.turn_time = turn_time
+        self.ai_delay = ai_delay
+        self.ai_workers = ai_workers or os.cpu_count()
+        self.sessions = {}
+        self.game_ids = itertools.count(1)
+        self.games_finished = 0
+        self.moves_received = 0
+        self.ai_batches = 0
+        self.ai_requests = 0
+        self.pending_ai = {}  # (size, win_length) -> [(board, difficulty value, seed, future)]
+        self.loop = None
+        self.scheduler = None
+        self.executor = None
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.loop = asyncio.get_running_loop()
+        self.scheduler = DeadlineScheduler(self.loop)
+        with ProcessPoolExecutor(self.ai_workers) as self.executor:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=1 << 16)
+            print(f"Serving on {host}:{port} with {self.ai_workers} AI worker(s)")
+            async with server:
+                await server.serve_forever()
+
+    def request_ai_move(self, session, seed):
+        """Queue session's AI turn for the next batch, returns a future of its (row, col)"""
+        future = self.loop.create_future()
+        if not self.pending_ai:
+            self.loop.call_soon(self.flush_ai_requests)
+        board = [row[:] for row in session.board]
+        self.pending_ai.setdefault((session.size, session.win_length), []).append(
+            (board, session.difficulty.value, seed, future))
+        return future
+
+    def flush_ai_requests(self):
+        """Send the queued AI turns to the pool, split into one batch per worker and board variant
+
+        Searches that run for the full think time go one per batch: in a
+        shared batch every reply would wait for all the searches before it.
+        """
+        pending, self.pending_ai = self.pending_ai, {}
+        for (size, win_length), queued in pending.items():
+            budgeted = [request for request in queued if uses_full_budget(request[1], size)]
+            cheap = [request for request in queued if not uses_full_budget(request[1], size)]
+            batches = [[request] for request in budgeted]
+            if cheap:
+                chunk = -(-len(cheap) // self.ai_workers)
+                batches += [cheap[start:start + chunk] for start in range(0, len(cheap), chunk)]
+            for batch in batches:
+                requests = [(board, value, seed) for board, value, seed, _ in batch]
+                moves = self.loop.run_in_executor(self.executor, search_moves, requests, size, win_length)
+                moves.add_done_callback(lambda done, batch=batch: self.resolve_ai_requests(done, batch))
+                self.ai_batches += 1
+                self.ai_requests += len(batch)
+
+    def resolve_ai_requests(self, done, batch):
+        for i, (*_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if done.cancelled():
+                future.cancel()
+            elif done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result()[i])
+
+    def stats(self):
+        return {
+            'event': 'stats',
+            'sessions': len(self.sessions),
+            'games_finished': self.games_finished,
+            'moves_received': self.moves_received,
+            'cpu_seconds': time.process_time(),
+            'pending_deadlines': len(self.scheduler.heap),
+            'ai_batches': self.ai_batches,
+            'ai_requests': self.ai_requests,
+        }
+
+    async def handle_connection(self, reader, writer):
+        def send(message):
+            writer.write(json.dumps(message).encode() + b'\n')
+
+        own_sessions = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    op = request['op']
+                except (ValueError, KeyError, TypeError):
+                    send({'event': 'error', 'message': "bad request"})
+                    continue
+
+                if op == 'new':
+                    try:
+                        difficulty = Difficulty[request.get('difficulty', 'MEDIUM').upper()]
+                        size = json_int(request.get('size', 3))
+                        win_length = json_int(request.get('win_length', size))
+                    except (KeyError, ValueError, TypeError, AttributeError):
+                        send({'event': 'error', 'message': "bad game settings"})
+                        continue
+                    if not 3 <= win_length <= size <= 15:
+                        send({'event': 'error', 'message': "unsupported board"})
+                        continue
+                    session = GameSession(self, next(self.game_ids), send, size, win_length, difficulty)
+                    self.sessions[session.game_id] = session
+                    own_sessions.append(session)
+                    session.start()
+                elif op == 'move':
+                    self.moves_received += 1
+                    try:
+                        session = self.sessions.get(json_int(request.get('game')))
+                    except ValueError:
+                        session = None  # Game ids are ints; true, floats or lists name no game
+                    if session is None or session.send is not send:
+                        send({'event': 'error', 'message': "no such game"})
+                        continue
+                    try:
+                        error = session.human_move(json_int(request['row']), json_int(request['col']))
+                    except (KeyError, ValueError):
+                        error = "bad move"
+                    if error:
+                        send({'event': 'error', 'game': session.game_id, 'message': error})
+                elif op == 'stats':
+                    send(self.stats())
+                else:
+                    send({'event': 'error', 'message': f"unknown op {op!r}"})
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for session in own_sessions:
+                if not session.closed:
+                    session.close()
+            writer.close()
+
+async def play_client_games(host, port, games, difficulty, size, win_length, latencies):
+    """One load-generator connection playing games back to back as a random human"""
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 16)
+
+    def send(message):
+        writer.write(json.dumps(message).encode() + b'\n')
+
+    moves = 0
+    for _ in range(games):
+        send({'op': 'new', 'difficulty': difficulty, 'size': size, 'win_length': win_length})
+        await writer.drain()
+        sent_at = None
+        while True:
+            event = json.loads(await reader.readline())
+            if event['event'] == 'error':
+                raise RuntimeError(event['message'])
+            if event['event'] == 'move' and event['player'] == 'X' and sent_at is not None:
+                latencies.append(time.perf_counter() - sent_at)
+                sent_at = None
+            if event['event'] == 'over':
+                break
+            if event['turn'] == 'X' and event['event'] in ('started', 'move'):
+                empty = [i for i, cell in enumerate(event['board']) if cell == '.']
+                row, col = divmod(random.choice(empty), size)
+                send({'op': 'move', 'game': event['game'], 'row': row, 'col': col})
+                await writer.drain()
+                sent_at = time.perf_counter()
+                moves += 1
+    writer.close()
+    return moves
+
+async def server_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'{"op": "stats"}\n')
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return stats
+
+async def run_load(host, port, sessions, games, difficulty, size, win_length):
+    """Run concurrent client sessions and report move round trips and server CPU per session"""
+    latencies = []
+    before = await server_stats(host, port)
+    start = time.perf_counter()
+    moves = await asyncio.gather(*(play_client_games(host, port, games, difficulty, size, win_length,
+                                                     latencies)
+                                   for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+    after = await server_stats(host, port)
+
+    cpu = after['cpu_seconds'] - before['cpu_seconds']
+    print(f"{sessions} concurrent sessions, {sessions * games} games, {sum(moves)} human moves "
+          f"in {elapsed:.1f}s")
+    print(f"move round trip: p50 {percentile(latencies, 0.5) * 1000:.2f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms  max {max(latencies, default=0) * 1000:.2f} ms")
+    batches = after['ai_batches'] - before['ai_batches']
+    if batches:
+        print(f"{after['ai_requests'] - before['ai_requests']} AI turns in {batches} pool batches")
+    if cpu > 0:
+        # Event-loop CPU only; AI searches run in the server's worker processes
+        print(f"server event loop used {cpu / elapsed:.1%} of a core "
+              f"(~{sessions * elapsed / cpu:.0f} sessions per core at this move rate)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-session Tic Tac Toe server and load generator")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="run the game server")
+    serve.add_argument('--turn-time', type=float, default=TIMER_DURATION,
+                       help="seconds per human turn before the random auto-move")
+    serve.add_argument('--ai-delay', type=float, default=AI_MOVE_DELAY,
+                       help="seconds before the AI answers")
+    serve.add_argument('--ai-workers', type=int, default=None, help="AI processes (default: all cores)")
+
+    load = commands.add_parser('load', help="play random games against a running server")
+    load.add_argument('--sessions', type=int, default=100, help="concurrent connections")
+    load.add_argument('--games', type=int, default=1, help="games per connection")
+    load.add_argument('--difficulty', default='MEDIUM')
+    load.add_argument('--size', type=int, default=3)
+    load.add_argument('--win-length', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        server = GameServer(args.turn_time, args.ai_delay, args.ai_workers)
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(run_load(args.host, args.port, args.sessions, args.games, args.difficulty,
+                             args.size, args.win_length))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Move hints: the game value of every empty cell for the player to move
+
+Each cell is scored the way HARD plays. The solved table answers exactly
+when the variant has one. Otherwise minimax deepens one ply at a time
+under the same search_time_budget HARD gets per move, and every cell is
+searched to the same depth per iteration, so scores stay comparable:
+proven wins, losses and draws are exact, the rest are open-line
+heuristic scores from the deepest iteration that finished.
+
+Results are cached per position, so a position is only ever evaluated
+once, and HintWorker fills a position's hints in on a background thread:
+the first, one-ply iteration cell by cell, cells next to the stones
+first, then each deeper iteration as a whole once it is done.
+"""
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from game_engine import GameEngine, LRUCache, Player, SearchTimeout
+
+HINT_CACHE_SIZE = 256  # Positions whose hints are kept
+
+# outcome is 'win', 'draw', 'loss' or None when a depth-limited search only
+# has a heuristic; plies counts to the result, the move itself included;
+# score runs from -1 (loss) to 1 (win) for shading
+Hint = namedtuple('Hint', ['outcome', 'plies', 'score'])
+
+def table_hint(table, x_mask, o_mask, cell, mark):
+    """Exact hint for mark playing cell, from a solved table"""
+    bit = 1 << cell
+    if mark == 'X':
+        x_mask |= bit
+    else:
+        o_mask |= bit
+    # The table answers for the opponent, who moves next
+    result, plies = table.result(x_mask, o_mask)
+    if result == 0:
+        return Hint('draw', None, 0.0)
+    return Hint('loss' if result > 0 else 'win', plies + 1, -float(result))
+
+def evaluate_cell(engine, x_mask, o_mask, cell, mark, plies=None):
+    """Hint for mark playing cell, searched plies deep on engine (None: to the end of the game)"""
+    bit = 1 << cell
+    if mark == 'X':
+        x_mask |= bit
+    else:
+        o_mask |= bit
+
+    # Scores are from O's point of view; the move itself is ply 1
+    score = engine.minimax_masks(x_mask, o_mask, 1, mark == 'X', max_depth=plies, last_move=cell)
+    if mark == 'X':
+        score = -score
+    win_score = engine.geometry.win_score
+    if score >= 1:
+        return Hint('win', win_score - score, 1.0)
+    if score <= -1:
+        return Hint('loss', win_score + score, -1.0)
+    empties = engine.geometry.cell_count - bin(x_mask | o_mask).count('1')
+    if plies is None or plies > empties:
+        return Hint('draw', None, 0.0)
+    return Hint(None, None, score)
+
+class HintCache(LRUCache):
+    """Bounded LRU cache of {cell: Hint} per position, filled in as hints arrive"""
+    def __init__(self, max_entries=HINT_CACHE_SIZE):
+        super().__init__(max_entries)
+
+    def entry(self, key):
+        """The hints dict for key, created empty if the position is new"""
+        hints = self.get(key)
+        if hints is None:
+            hints = {}
+            self.put(key, hints)
+        return hints
+
+def hint_key(game):
+    """Cache key of the position on game, for the player to move"""
+    mark = 'X' if game.current_player == Player.HUMAN else 'O'
+    return game.size, game.win_length, game.x_mask, game.o_mask, mark
+
+class HintWorker:
+    """Fills one position's hints at a time on a background thread
+
+    Like AIWorker, the search runs on a private GameEngine (whose search
+    cache carries over from cell to cell and position to position), and
+    on_update, if given, is called from the worker thread whenever more
+    hints are in.
+    """
+    def __init__(self, cache, on_update=None):
+        self.cache = cache
+        self.on_update = on_update
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='hint-search')
+        self.engine = GameEngine()
+        self.future = None
+        self.cancel_event = None
+        self.key = None
+
+    def request(self, game):
+        """Make sure the hints for game's position are complete or being filled in"""
+        key = hint_key(game)
+        if key == self.key and self.busy:
+            return
+        hints = self.cache.entry(key)
+        empty = game.geometry.full_mask & ~(game.x_mask | game.o_mask)
+        if len(hints) == bin(empty).count('1'):
+            return
+        self.cancel()
+        self.key = key
+        self.cancel_event = threading.Event()
+        self.future = self.executor.submit(self._fill, game.snapshot(), key, hints, game.search_time_budget,
+                                           self.cancel_event)
+
+    def _fill(self, snapshot, key, hints, time_budget, cancel_event):
+        size, win_length, x_mask, o_mask, mark = key
+        engine = self.engine
+        if (engine.size, engine.win_length) != (size, win_length):
+            engine.set_board_variant(size, win_length)
+        engine.restore(snapshot)
+        engine.cancel_event = cancel_event
+        geometry = engine.geometry
+        nearby = geometry.candidate_moves(x_mask, o_mask)
+        cells = list(nearby) + [cell for cell in geometry.cells(geometry.full_mask & ~(x_mask | o_mask))
+                                if cell not in nearby]
+        table = engine.solved_table()
+        try:
+            if table is not None:
+                for cell in cells:
+                    if cell not in hints:
+                        hints[cell] = table_hint(table, x_mask, o_mask, cell, mark)
+                        self._updated()
+                return
+
+            # Deepen like iterative_deepening_move: the last finished
+            # iteration stands when the budget runs out
+            engine.search_deadline = time.perf_counter() + time_budget
+            for cell in cells:
+                if cell not in hints:
+                    hints[cell] = evaluate_cell(engine, x_mask, o_mask, cell, mark, 1)
+                    self._updated()
+            for plies in range(2, len(cells) + 1):
+                open_cells = [cell for cell in cells if hints[cell].outcome is None]
+                if not open_cells:
+                    break
+                deeper = {cell: evaluate_cell(engine, x_mask, o_mask, cell, mark, plies) for cell in open_cells}
+                hints.update(deeper)
+                self._updated()
+        except SearchTimeout:
+            pass  # Out of time or cancelled part way through an iteration
+        finally:
+            engine.search_deadline = None
+            engine.cancel_event = None
+
+    def _updated(self):
+        if self.on_update is not None:
+            self.on_update()
+
+    @property
+    def busy(self):
+        return self.future is not None and not self.future.done()
+
+    def cancel(self):
+        """Stop filling the current position; the hints found so far stay cached"""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.future = None
+        self.cancel_event = None
+        self.key = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,249 @@
+"""Monte Carlo Tree Search for boards too big for exhaustive minimax
+
+Each playout walks the tree by UCT, adds one node, finishes the game with
+random moves and backs the result up the path. The tree is kept between
+moves: when the next search starts from a position one or two plies below
+the old root (the AI's own move and the opponent's reply), that subtree
+becomes the new root and its statistics carry over.
+
+MCTSPlayer runs the search root-parallel: every worker process grows its
+own tree from the same position with a different random stream, and the
+root children's visit counts are summed before picking the move. With one
+worker the search runs in the calling thread instead.
+"""
+import math
+import multiprocessing
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from game_engine import get_geometry
+
+UCT_EXPLORATION = 1.4  # C in wins / visits + C * sqrt(ln(parent visits) / visits)
+STOP_CHECK_INTERVAL = 16  # Playouts between clock and cancel checks
+CANCEL_POLL_INTERVAL = 0.02  # Seconds between cancel checks while waiting on the workers
+
+class MCTSNode:
+    """One position in the search tree, reached by mark playing move"""
+    __slots__ = ('move', 'mark', 'parent', 'x_mask', 'o_mask', 'winner', 'children', 'untried',
+                 'visits', 'wins')
+
+    def __init__(self, geometry, x_mask, o_mask, mark, move=None, parent=None, rng=random):
+        self.move = move
+        self.mark = mark  # The player who made move, results are scored for them
+        self.parent = parent
+        self.x_mask = x_mask
+        self.o_mask = o_mask
+        self.children = []
+        self.visits = 0
+        self.wins = 0.0  # 1 per win for mark, 0.5 per tie
+
+        own_mask = x_mask if mark == 'X' else o_mask
+        if move is not None and geometry.wins_at(own_mask, move):
+            self.winner = mark
+        elif x_mask | o_mask == geometry.full_mask:
+            self.winner = 'tie'
+        else:
+            self.winner = None
+        if self.winner is None:
+            self.untried = list(geometry.candidate_moves(x_mask, o_mask))
+            rng.shuffle(self.untried)
+        else:
+            self.untried = []
+
+    def select_child(self):
+        """The child with the best UCT score"""
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits +
+                   UCT_EXPLORATION * math.sqrt(log_visits / child.visits))
+
+class MCTSTree:
+    """A search tree for one board variant, reused from move to move"""
+    def __init__(self, geometry, seed=None):
+        self.geometry = geometry
+        self.rng = random.Random(seed)
+        self.root = None
+        self.reused = False  # Whether the last search started from an existing subtree
+
+    def move_to(self, x_mask, o_mask, mark):
+        """Make the position with mark to move the root, keeping a matching subtree"""
+        root = self.root
+        self.reused = False
+        if root is not None:
+            # The position itself, or one or two plies below the old root
+            for node in [root] + root.children + [grandchild for child in root.children
+                                                  for grandchild in child.children]:
+                if node.x_mask == x_mask and node.o_mask == o_mask and node.mark != mark:
+                    node.parent = None
+                    self.root = node
+                    self.reused = True
+                    return
+        opponent = 'X' if mark == 'O' else 'O'
+        self.root = MCTSNode(self.geometry, x_mask, o_mask, opponent, rng=self.rng)
+
+    def playout(self):
+        """One selection, expansion, rollout and backup pass"""
+        node = self.root
+        while node.winner is None and not node.untried and node.children:
+            node = node.select_child()
+        if node.winner is None and node.untried:
+            move = node.untried.pop()
+            mark = 'X' if node.mark == 'O' else 'O'
+            if mark == 'X':
+                child = MCTSNode(self.geometry, node.x_mask | 1 << move, node.o_mask, mark, move, node,
+                                 self.rng)
+            else:
+                child = MCTSNode(self.geometry, node.x_mask, node.o_mask | 1 << move, mark, move, node,
+                                 self.rng)
+            node.children.append(child)
+            node = child
+        winner = node.winner or self.rollout(node)
+        while node is not None:
+            node.visits += 1
+            if winner == node.mark:
+                node.wins += 1
+            elif winner == 'tie':
+                node.wins += 0.5
+            node = node.parent
+
+    def rollout(self, node):
+        """Finish the game from node with uniformly random moves, returns the winner"""
+        geometry = self.geometry
+        x_mask, o_mask = node.x_mask, node.o_mask
+        cells = list(geometry.cells(geometry.full_mask & ~(x_mask | o_mask)))
+        self.rng.shuffle(cells)
+        x_to_move = node.mark == 'O'
+        for cell in cells:
+            if x_to_move:
+                x_mask |= 1 << cell
+                if geometry.wins_at(x_mask, cell):
+                    return 'X'
+            else:
+                o_mask |= 1 << cell
+                if geometry.wins_at(o_mask, cell):
+                    return 'O'
+            x_to_move = not x_to_move
+        return 'tie'
+
+    def search(self, x_mask, o_mask, mark, playouts=None, deadline=None, should_stop=None):
+        """Run playouts from the position until the count, deadline or should_stop() says so
+
+        Returns the number of playouts run. At least one playout is always
+        made so the root has a child to pick.
+        """
+        self.move_to(x_mask, o_mask, mark)
+        count = 0
+        while True:
+            self.playout()
+            count += 1
+            if playouts is not None and count >= playouts:
+                break
+            if count % STOP_CHECK_INTERVAL == 0:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                if should_stop is not None and should_stop():
+                    break
+        return count
+
+    def root_stats(self):
+        """{move: (visits, wins)} over the root's children"""
+        return {child.move: (child.visits, child.wins) for child in self.root.children}
+
+class MCTSStats:
+    """Outcome of one MCTS move: playouts run and how fast"""
+    def __init__(self, move, playouts, seconds, workers, reused):
+        self.move = move
+        self.playouts = playouts
+        self.seconds = seconds
+        self.workers = workers
+        self.reused = reused  # Trees that continued from the previous move's subtree
+
+    @property
+    def playouts_per_second(self):
+        return self.playouts / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return (f"MCTSStats(move={self.move}, playouts={self.playouts}, "
+                f"pps={self.playouts_per_second:.0f}, workers={self.workers}, reused={self.reused})")
+
+# Worker process state: one tree per board variant, and the search generation
+# the parent bumps to stop every running search early
+_trees = {}
+_generation = None
+
+def _init_worker(generation):
+    global _generation
+    _generation = generation
+
+def run_search(size, win_length, x_mask, o_mask, mark, playouts, time_budget, seed, generation):
+    """Executor entry point: grow this process's tree, returns (root stats, playouts, reused)"""
+    tree = _trees.get((size, win_length))
+    if tree is None:
+        tree = _trees[(size, win_length)] = MCTSTree(get_geometry(size, win_length))
+    tree.rng.seed(seed)
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    count = tree.search(x_mask, o_mask, mark, playouts, deadline,
+                        lambda: _generation.value != generation)
+    return tree.root_stats(), count, tree.reused
+
+class MCTSPlayer:
+    """Picks moves by root-parallel MCTS across worker processes"""
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.tree = None  # Used when searching in-process with one worker
+        self.executor = None
+        self.generation = None
+        self.last_search = None  # MCTSStats of the last move
+
+    def search(self, geometry, x_mask, o_mask, mark, playouts=None, time_budget=None,
+               cancel_event=None):
+        """Best cell for mark, by total root visits, within playouts and/or time_budget seconds"""
+        start = time.perf_counter()
+        if self.workers <= 1:
+            if self.tree is None or self.tree.geometry is not geometry:
+                self.tree = MCTSTree(geometry)
+            deadline = start + time_budget if time_budget is not None else None
+            should_stop = cancel_event.is_set if cancel_event is not None else None
+            count = self.tree.search(x_mask, o_mask, mark, playouts, deadline, should_stop)
+            totals = {move: visits for move, (visits, _) in self.tree.root_stats().items()}
+            reused = int(self.tree.reused)
+        else:
+            totals, count, reused = self._search_parallel(geometry, x_mask, o_mask, mark, playouts,
+                                                          time_budget, cancel_event)
+        move = max(totals, key=totals.get) if totals else None
+        self.last_search = MCTSStats(move, count, time.perf_counter() - start, self.workers, reused)
+        return move
+
+    def _search_parallel(self, geometry, x_mask, o_mask, mark, playouts, time_budget, cancel_event):
+        if self.executor is None:
+            # Spawned rather than forked: the search may be started from a thread
+            context = multiprocessing.get_context('spawn')
+            self.generation = context.RawValue('Q', 0)
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=context,
+                                                initializer=_init_worker, initargs=(self.generation,))
+        generation = self.generation.value
+        share = -(-playouts // self.workers) if playouts is not None else None
+        futures = [self.executor.submit(run_search, geometry.size, geometry.win_length, x_mask, o_mask,
+                                        mark, share, time_budget, random.getrandbits(32), generation)
+                   for _ in range(self.workers)]
+        pending = set(futures)
+        while pending:
+            if cancel_event is not None and cancel_event.is_set() and self.generation.value == generation:
+                self.generation.value += 1
+            _, pending = wait(pending, CANCEL_POLL_INTERVAL, FIRST_COMPLETED)
+
+        totals = {}
+        count = reused = 0
+        for future in futures:
+            stats, playouts_run, tree_reused = future.result()
+            for move, (visits, _) in stats.items():
+                totals[move] = totals.get(move, 0) + visits
+            count += playouts_run
+            reused += tree_reused
+        return totals, count, reused
+
+    def close(self):
+        if self.executor is not None:
+            self.generation.value += 1
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,133 @@
+"""Stateless batch move selection: many AI turns answered in one call
+
+A request is (board, difficulty, seed) and its answer is the (row, col)
+ai_strategic_move would play on that board, with every random choice drawn
+from random.Random(seed), so the same request always gets the same move.
+The side to move follows from the stone counts (X moves first), and
+finished boards get None.
+
+Per batch, identical requests are answered once, and on 3x3 the game-over,
+win and block checks for every distinct position run as one vectorized
+pass (batch_rules). HARD never draws on its seed, so its moves are cached
+by position in a cache shared by every call on the same Policy.
+
+    moves = choose_moves([(board, Difficulty.HARD, 7), (board, Difficulty.EASY, 8)])
+"""
+import random
+
+import numpy as np
+
+import batch_rules
+from game_engine import (
+    RANDOM_MOVE_RATES, Difficulty, GameEngine, GameSnapshot, LRUCache, Player, board_to_masks,
+)
+
+POLICY_CACHE_SIZE = 100000  # Cached HARD moves per Policy
+
+class Policy:
+    """Answers batches of requests for one board variant, see the module docstring"""
+    def __init__(self, size=3, win_length=3, cache_size=POLICY_CACHE_SIZE):
+        self.engine = GameEngine(size, win_length)
+        self.engine.mcts_workers = 1  # Batches are already spread over processes by the caller
+        self.cache = LRUCache(cache_size)  # (x_mask, o_mask) -> HARD move
+
+    def choose_moves(self, requests):
+        """(row, col), or None when there is no move to make, per (board, difficulty, seed)"""
+        positions = {}  # (x_mask, o_mask) -> index of its analysis
+        keys = []
+        for board, difficulty, seed in requests:
+            x_mask, o_mask = board_to_masks(board)
+            positions.setdefault((x_mask, o_mask), len(positions))
+            # HARD ignores the seed, so all its requests for a position are one
+            keys.append((x_mask, o_mask, difficulty, None if difficulty == Difficulty.HARD else seed))
+        analysis = self.analyze(list(positions))
+
+        moves = {}
+        results = []
+        for key in keys:
+            if key not in moves:
+                moves[key] = self.move(key, analysis[positions[key[:2]]])
+            results.append(moves[key])
+        return results
+
+    def analyze(self, positions):
+        """(mark to move or None if there is no move, winning cell, blocking cell) per position"""
+        marks = []
+        for x_mask, o_mask in positions:
+            balance = bin(x_mask).count('1') - bin(o_mask).count('1')
+            marks.append('X' if balance == 0 else 'O' if balance == 1 else None)
+
+        geometry = self.engine.geometry
+        if geometry.classic and positions:
+            x_masks = np.array([x_mask for x_mask, _ in positions], dtype=np.int16)
+            o_masks = np.array([o_mask for _, o_mask in positions], dtype=np.int16)
+            # Winning moves are X's, blocking moves O's
+            batch = batch_rules.analyze_masks(x_masks, o_masks, batch_rules.X)
+            over = batch.winner != batch_rules.EMPTY
+            x_cells = [None if cell == batch_rules.NO_MOVE else int(cell) for cell in batch.winning_move]
+            o_cells = [None if cell == batch_rules.NO_MOVE else int(cell) for cell in batch.blocking_move]
+        else:
+            over = [self.engine.masks_winner(x_mask, o_mask) is not None or
+                    x_mask | o_mask == geometry.full_mask for x_mask, o_mask in positions]
+            x_cells = [geometry.winning_cell(x_mask, o_mask) for x_mask, o_mask in positions]
+            o_cells = [geometry.winning_cell(o_mask, x_mask) for x_mask, o_mask in positions]
+
+        analysis = []
+        for i, mark in enumerate(marks):
+            if over[i] or mark is None:
+                analysis.append((None, None, None))
+            elif mark == 'X':
+                analysis.append((mark, x_cells[i], o_cells[i]))
+            else:
+                analysis.append((mark, o_cells[i], x_cells[i]))
+        return analysis
+
+    def move(self, key, analysis):
+        x_mask, o_mask, difficulty, seed = key
+        mark, winning_cell, blocking_cell = analysis
+        if mark is None:
+            return None
+        if difficulty == Difficulty.HARD:
+            move = self.cache.get((x_mask, o_mask))
+            if move is not None:
+                return move
+
+        engine = self.engine
+        engine.restore(GameSnapshot(x_mask, o_mask, Player.HUMAN if mark == 'X' else Player.AI, None))
+        engine.difficulty = difficulty
+        rng = random.Random(seed)
+        size = engine.size
+
+        # The same steps as ai_strategic_move, with the win and block checks
+        # already answered by analyze()
+        rate = RANDOM_MOVE_RATES.get(difficulty)
+        if rate is not None and rng.random() < rate:
+            move = rng.choice(engine.get_empty_cells())
+        elif difficulty == Difficulty.HARD:
+            # A solved table is consulted before the win and block checks
+            move = engine.ai_strategic_move(mark, rng)
+        elif winning_cell is not None:
+            move = divmod(winning_cell, size)
+        elif blocking_cell is not None:
+            move = divmod(blocking_cell, size)
+        elif difficulty == Difficulty.MCTS:
+            move = engine.ai_strategic_move(mark, rng)
+        else:
+            move = engine.positional_move(x_mask, o_mask, rng)
+
+        if difficulty == Difficulty.HARD:
+            self.cache.put((x_mask, o_mask), move)
+        return move
+
+# One Policy per board variant, so every call in a process shares its cache
+_policies = {}
+
+def get_policy(size=3, win_length=3):
+    policy = _policies.get((size, win_length))
+    if policy is None:
+        policy = _policies[(size, win_length)] = Policy(size, win_length)
+    return policy
+
+def choose_moves(requests, size=3, win_length=3):
+    """Policy.choose_moves on this process's shared Policy for the variant"""
+    return get_policy(size, win_length).choose_moves(requests)
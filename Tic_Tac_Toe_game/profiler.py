@@ -0,0 +1,123 @@
+"""Opt-in frame and AI timing for the pygame front end
+
+FrameProfiler splits every main-loop iteration into named sections (events,
+update, draw, flip) and keeps the last PROFILE_HISTORY frames for the HUD
+percentiles and the exported stats. Sections nest: time spent in an inner
+section is not counted again in the one around it, so the draw time does
+not include the display flip it triggers. AI searches run on the worker
+thread and are recorded separately with record_ai. StartupTimer breaks the
+time from launch to the first frame into its phases.
+"""
+import csv
+import json
+import time
+from collections import deque
+
+PROFILE_HISTORY = 3600  # Frames kept, one minute at 60 FPS
+FRAME_SECTIONS = ('events', 'update', 'draw', 'flip')
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values (0-1 fraction), 0.0 when empty"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class Section:
+    """Context manager timing one FrameProfiler section"""
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.stack.append([self.name, time.perf_counter(), 0.0])
+
+    def __exit__(self, *exc_info):
+        name, start, nested = self.profiler.stack.pop()
+        elapsed = time.perf_counter() - start
+        current = self.profiler.current
+        current[name] = current.get(name, 0.0) + elapsed - nested
+        if self.profiler.stack:
+            self.profiler.stack[-1][2] += elapsed
+
+class FrameProfiler:
+    """Per-frame section timings and AI search stats"""
+    def __init__(self, history=PROFILE_HISTORY):
+        self.frames = deque(maxlen=history)   # {section: seconds} per frame
+        self.ai_searches = deque(maxlen=history)  # (seconds, nodes) per AI move
+        self.current = {}
+        self.stack = []
+        self.frame_count = 0
+        self.sections = {name: Section(self, name) for name in FRAME_SECTIONS}
+
+    def section(self, name):
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = Section(self, name)
+        return section
+
+    def end_frame(self):
+        self.frames.append(self.current)
+        self.current = {}
+        self.frame_count += 1
+
+    def record_ai(self, seconds, nodes):
+        self.ai_searches.append((seconds, nodes))
+
+    def frame_times(self):
+        return [sum(frame.values()) for frame in self.frames]
+
+    def summary(self):
+        """Milliseconds p50/p99/max per section plus AI totals over the kept history"""
+        def stats(values):
+            return {
+                'p50_ms': percentile(values, 0.5) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+                'max_ms': max(values, default=0.0) * 1000,
+            }
+        sections = {name: stats([frame.get(name, 0.0) for frame in self.frames])
+                    for name in FRAME_SECTIONS}
+        ai_seconds = [seconds for seconds, _ in self.ai_searches]
+        return {
+            'frames': self.frame_count,
+            'frame': stats(self.frame_times()),
+            'sections': sections,
+            'ai': dict(stats(ai_seconds), searches=len(self.ai_searches),
+                       nodes=sum(nodes for _, nodes in self.ai_searches)),
+        }
+
+    def export(self, path):
+        """Write the kept frames as CSV, or the summary and frames as JSON for a .json path"""
+        rows = [[frame.get(name, 0.0) * 1000 for name in FRAME_SECTIONS] for frame in self.frames]
+        if path.endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump({
+                    'summary': self.summary(),
+                    'columns_ms': list(FRAME_SECTIONS),
+                    'frames': rows,
+                    'ai_searches': [{'ms': seconds * 1000, 'nodes': nodes}
+                                    for seconds, nodes in self.ai_searches],
+                }, f, indent=2)
+        else:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['frame'] + [f'{name}_ms' for name in FRAME_SECTIONS] + ['total_ms'])
+                first = self.frame_count - len(rows)
+                for i, row in enumerate(rows):
+                    writer.writerow([first + i] + [f'{value:.3f}' for value in row] + [f'{sum(row):.3f}'])
+
+class StartupTimer:
+    """Wall time of each startup phase, each mark() closing the phase since the last one"""
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.phases = []  # (name, seconds)
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def report(self):
+        lines = [f"{name:<24}{seconds * 1000:>9.1f} ms" for name, seconds in self.phases]
+        lines.append(f"{'total':<24}{(self.last - self.start) * 1000:>9.1f} ms")
+        return '\n'.join(lines)
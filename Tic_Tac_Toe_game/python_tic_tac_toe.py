@@ -1,21 +1,40 @@
-import pygame
+import argparse
 import sys
-import random
-import time
-from enum import Enum
 
-# Initialize Pygame
-pygame.init()
+def run_headless(argv):
+    """Play in the terminal with terminal_game.py, passing it every other option"""
+    import terminal_game
+    return terminal_game.main([arg for arg in argv if arg != '--headless'])
+
+if __name__ == "__main__" and '--headless' in sys.argv[1:]:
+    # Terminal play needs neither pygame nor SDL, so hand over before importing them
+    sys.exit(run_headless(sys.argv[1:]))
+
+import pygame
+from contextlib import nullcontext
+from functools import cached_property, lru_cache
+from ai_worker import AIWorker
+from game_engine import (
+    BOARD_VARIANTS, TIMER_DURATION, Difficulty, GameEngine, GameState, LRUCache, Player,
+)
+from game_record import GameRecordWriter, read_records, replay
+from hints import HintCache, HintWorker, hint_key
+from profiler import FrameProfiler, StartupTimer, percentile
 
 # Game constants
 WINDOW_WIDTH = 500
 WINDOW_HEIGHT = 650
 BOARD_SIZE = 300
-BOARD_OFFSET_X = (WINDOW_WIDTH - BOARD_SIZE) // 2
 BOARD_OFFSET_Y = 180
-CELL_SIZE = BOARD_SIZE // 3
-TIMER_DURATION = 10  # 10 seconds per turn
-AI_MOVE_DELAY = 3  # 3 seconds for AI to move
+TIMER_BAR_WIDTH = 200
+TEXT_CACHE_SIZE = 256  # Rendered label surfaces kept around
+MAX_FPS = 60
+REPLAY_STEP_DELAY = 0.5  # Seconds between moves when replaying recorded games
+
+# Posted by the AI worker thread when a search finishes
+AI_DONE_EVENT = pygame.event.custom_type()
+# Posted by the hint worker thread each time another cell's hint is ready
+HINT_EVENT = pygame.event.custom_type()
 
 # Colors
 WHITE = (255, 255, 255)
@@ -26,438 +45,418 @@ GREEN = (34, 139, 34)
 GRAY = (128, 128, 128)
 LIGHT_BLUE = (173, 216, 230)
 ORANGE = (255, 165, 0)
+PURPLE = (128, 0, 128)
 YELLOW = (255, 255, 0)
 
-class GameState(Enum):
-    MENU = 1
-    PLAYING = 2
-    GAME_OVER = 3
+# Screen regions the renderer refreshes on their own
+STATUS_RECT = pygame.Rect(0, 72, WINDOW_WIDTH, 24)
+TIMER_RECT = pygame.Rect(0, 125, WINDOW_WIDTH, 45)
+HUD_RECT = pygame.Rect(0, WINDOW_HEIGHT - 90, WINDOW_WIDTH, 90)  # Blank on every screen
 
-class Difficulty(Enum):
-    EASY = 1
-    MEDIUM = 2
-    HARD = 3
+HUD_FRAMES = 100  # Frame time bars shown in the profiler HUD
+HUD_FULL_SCALE = 1 / 30  # Frame time (seconds) of a full-height bar
+NO_SECTION = nullcontext()
 
-class Player(Enum):
-    HUMAN = 1
-    AI = 2
+class TextCache(LRUCache):
+    """Bounded LRU cache of rendered text surfaces
 
-class TicTacToe:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-        pygame.display.set_caption("Tic Tac Toe - Timed Battle")
-        self.clock = pygame.time.Clock()
-        
-        # Fonts
-        self.title_font = pygame.font.Font(None, 40)
-        self.button_font = pygame.font.Font(None, 28)
-        self.small_font = pygame.font.Font(None, 24)
-        self.timer_font = pygame.font.Font(None, 36)
-        
-        # Game state
-        self.state = GameState.MENU
-        self.difficulty = Difficulty.MEDIUM
-        self.board = [['' for _ in range(3)] for _ in range(3)]
-        self.current_player = Player.HUMAN
-        self.winner = None
-        
-        # Timer variables
-        self.turn_start_time = 0
-        self.time_remaining = TIMER_DURATION
-        self.auto_move_made = False
-        self.ai_move_timer = 0  # Timer for AI moves
-        
-    def reset_game(self):
-        self.board = [['' for _ in range(3)] for _ in range(3)]
-        self.current_player = Player.HUMAN
-        self.winner = None
-        self.state = GameState.PLAYING
-        self.turn_start_time = time.time()
-        self.time_remaining = TIMER_DURATION
-        self.auto_move_made = False
-        self.ai_move_timer = 0
-        
-    def check_winner(self):
-        # Check rows
-        for i in range(3):
-            if self.board[i][0] == self.board[i][1] == self.board[i][2] != '':
-                return self.board[i][0]
-        
-        # Check columns
-        for j in range(3):
-            if self.board[0][j] == self.board[1][j] == self.board[2][j] != '':
-                return self.board[0][j]
-        
-        # Check diagonals
-        if self.board[0][0] == self.board[1][1] == self.board[2][2] != '':
-            return self.board[0][0]
-            
-        if self.board[0][2] == self.board[1][1] == self.board[2][0] != '':
-            return self.board[0][2]
-        
-        # Check for tie
-        if all(self.board[i][j] != '' for i in range(3) for j in range(3)):
-            return 'tie'
-            
-        return None
-        
-    def get_empty_cells(self):
-        return [(i, j) for i in range(3) for j in range(3) if self.board[i][j] == '']
-        
-    def evaluate_position(self, board, player):
-        """Evaluate the current board position"""
-        winner = self.check_winner_board(board)
-        if winner == player:
-            return 100
-        elif winner and winner != player:
-            return -100
-        else:
-            return 0
-            
-    def minimax(self, board, depth, is_maximizing, alpha=float('-inf'), beta=float('inf')):
-        winner = self.check_winner_board(board)
-        if winner == 'O':  # AI wins
-            return 10 - depth
-        elif winner == 'X':  # Human wins
-            return depth - 10
-        elif self.is_board_full_board(board):  # Tie
-            return 0
-            
-        if depth > 6:  # Limit depth for performance
-            return 0
-            
-        if is_maximizing:
-            max_eval = float('-inf')
-            for i in range(3):
-                for j in range(3):
-                    if board[i][j] == '':
-                        board[i][j] = 'O'
-                        eval_score = self.minimax(board, depth + 1, False, alpha, beta)
-                        board[i][j] = ''
-                        max_eval = max(max_eval, eval_score)
-                        alpha = max(alpha, eval_score)
-                        if beta <= alpha:
-                            break
-            return max_eval
+    Labels are rasterized once per (font, text, color, antialias) and reused
+    on every later frame, so only text that actually changes (the timer once
+    a second, the status line once a turn) costs a font render.
+    """
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        super().__init__(max_entries)
+        
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, color, antialias)
+        surface = self.get(key)
+        if surface is None:
+            surface = font.render(text, antialias, color)
+            self.put(key, surface)
+        return surface
+
+class Layout:
+    """Where every button and board cell sits on one screen
+
+    Built once per (screen, board size, window width) by get_layout, so a
+    click resolves with a rect check over a handful of buttons and integer
+    division for the board, without drawing anything.
+    """
+    def __init__(self, state, size, width=WINDOW_WIDTH):
+        self.size = size
+        self.cell_size = BOARD_SIZE // size
+        
+        if state == GameState.MENU:
+            button_width = 200
+            button_height = 45
+            button_x = (width - button_width) // 2
+            self.board_rect = None
+            self.buttons = {
+                'easy': pygame.Rect(button_x, 160, button_width, button_height),
+                'medium': pygame.Rect(button_x, 225, button_width, button_height),
+                'hard': pygame.Rect(button_x, 290, button_width, button_height),
+                'mcts': pygame.Rect(button_x, 355, button_width, button_height),
+                'board': pygame.Rect(button_x - 50, 430, button_width + 100, 40),
+                'quit': pygame.Rect(button_x, 485, button_width, button_height)
+            }
         else:
-            min_eval = float('inf')
-            for i in range(3):
-                for j in range(3):
-                    if board[i][j] == '':
-                        board[i][j] = 'X'
-                        eval_score = self.minimax(board, depth + 1, True, alpha, beta)
-                        board[i][j] = ''
-                        min_eval = min(min_eval, eval_score)
-                        beta = min(beta, eval_score)
-                        if beta <= alpha:
-                            break
-            return min_eval
+            # Playing and game over share the board and the bottom row of buttons
+            button_width = 100
+            button_height = 40
+            button_gap = 15
+            button_y = BOARD_OFFSET_Y + BOARD_SIZE + 30
+            names = ('menu', 'restart', 'undo', 'redo')
+            button_x = (width - len(names) * button_width - (len(names) - 1) * button_gap) // 2
+            self.board_rect = pygame.Rect((width - BOARD_SIZE) // 2, BOARD_OFFSET_Y, BOARD_SIZE, BOARD_SIZE)
+            self.buttons = {
+                name: pygame.Rect(button_x + i * (button_width + button_gap), button_y, button_width, button_height)
+                for i, name in enumerate(names)
+            }
             
-    def check_winner_board(self, board):
-        # Check rows
-        for i in range(3):
-            if board[i][0] == board[i][1] == board[i][2] != '':
-                return board[i][0]
-        
-        # Check columns
-        for j in range(3):
-            if board[0][j] == board[1][j] == board[2][j] != '':
-                return board[0][j]
-        
-        # Check diagonals
-        if board[0][0] == board[1][1] == board[2][2] != '':
-            return board[0][0]
-            
-        if board[0][2] == board[1][1] == board[2][0] != '':
-            return board[0][2]
-            
-        return None
-        
-    def is_board_full_board(self, board):
-        return all(board[i][j] != '' for i in range(3) for j in range(3))
-        
-    def find_winning_move(self, board, player):
-        """Find a move that wins the game immediately"""
-        for i in range(3):
-            for j in range(3):
-                if board[i][j] == '':
-                    board[i][j] = player
-                    if self.check_winner_board(board) == player:
-                        board[i][j] = ''
-                        return (i, j)
-                    board[i][j] = ''
+    def cell_rect(self, row, col):
+        return pygame.Rect(self.board_rect.x + col * self.cell_size, self.board_rect.y + row * self.cell_size,
+                           self.cell_size, self.cell_size)
+        
+    def hit_test(self, pos):
+        """Return ('button', name), ('cell', (row, col)) or None for a click at pos"""
+        for name, rect in self.buttons.items():
+            if rect.collidepoint(pos):
+                return 'button', name
+        if self.board_rect is not None and self.board_rect.collidepoint(pos):
+            col = (pos[0] - self.board_rect.x) // self.cell_size
+            row = (pos[1] - self.board_rect.y) // self.cell_size
+            if row < self.size and col < self.size:
+                return 'cell', (row, col)
         return None
-        
-    def find_blocking_move(self, board, opponent):
-        """Find a move that blocks opponent from winning"""
-        return self.find_winning_move(board, opponent)
-        
-    def find_fork_move(self, board, player):
-        """Find a move that creates two winning opportunities"""
-        for i in range(3):
-            for j in range(3):
-                if board[i][j] == '':
-                    board[i][j] = player
-                    winning_moves = 0
-                    for x in range(3):
-                        for y in range(3):
-                            if board[x][y] == '':
-                                board[x][y] = player
-                                if self.check_winner_board(board) == player:
-                                    winning_moves += 1
-                                board[x][y] = ''
-                    board[i][j] = ''
-                    if winning_moves >= 2:
-                        return (i, j)
-        return None
-        
-    def ai_strategic_move(self):
-        """Enhanced AI strategy based on difficulty"""
-        empty_cells = self.get_empty_cells()
-        board_copy = [row[:] for row in self.board]
-        
-        # Easy mode - mostly random with some basic strategy
-        if self.difficulty == Difficulty.EASY:
-            if random.random() < 0.7:  # 70% random
-                return random.choice(empty_cells)
-        
-        # Medium mode - good strategy with some randomness
-        elif self.difficulty == Difficulty.MEDIUM:
-            if random.random() < 0.3:  # 30% random
-                return random.choice(empty_cells)
-        
-        # Strategic play for medium and hard modes
-        
-        # 1. Try to win immediately
-        winning_move = self.find_winning_move(board_copy, 'O')
-        if winning_move:
-            return winning_move
-            
-        # 2. Block opponent from winning
-        blocking_move = self.find_blocking_move(board_copy, 'X')
-        if blocking_move:
-            return blocking_move
-            
-        # 3. Create a fork (hard mode only)
-        if self.difficulty == Difficulty.HARD:
-            fork_move = self.find_fork_move(board_copy, 'O')
-            if fork_move:
-                return fork_move
-                
-            # Block opponent's fork
-            opponent_fork = self.find_fork_move(board_copy, 'X')
-            if opponent_fork:
-                return opponent_fork
-        
-        # 4. Take center if available
-        if self.board[1][1] == '':
-            return (1, 1)
-            
-        # 5. Take corners (strategic positions)
-        corners = [(0, 0), (0, 2), (2, 0), (2, 2)]
-        available_corners = [(i, j) for i, j in corners if self.board[i][j] == '']
-        if available_corners:
-            return random.choice(available_corners)
-            
-        # 6. Take sides
-        sides = [(0, 1), (1, 0), (1, 2), (2, 1)]
-        available_sides = [(i, j) for i, j in sides if self.board[i][j] == '']
-        if available_sides:
-            return random.choice(available_sides)
-            
-        # 7. Fallback to minimax for hard mode
-        if self.difficulty == Difficulty.HARD:
-            best_score = float('-inf')
-            best_move = None
-            
-            for i, j in empty_cells:
-                board_copy[i][j] = 'O'
-                score = self.minimax(board_copy, 0, False)
-                board_copy[i][j] = ''
-                
-                if score > best_score:
-                    best_score = score
-                    best_move = (i, j)
-                    
-            return best_move if best_move else random.choice(empty_cells)
-        
-        # Fallback
-        return random.choice(empty_cells) if empty_cells else None
-        
-    def update_timer(self):
-        """Update the timer and handle automatic moves"""
-        if self.state != GameState.PLAYING or self.winner:
-            return
-            
-        current_time = time.time()
-        
-        if self.current_player == Player.HUMAN:
-            # Timer only runs for human player
-            elapsed = current_time - self.turn_start_time
-            self.time_remaining = max(0, TIMER_DURATION - elapsed)
+
+@lru_cache(maxsize=None)
+def get_layout(state, size, width=WINDOW_WIDTH):
+    return Layout(state, size, width)
+
+# Mark and grid drawing, shared by the game screen and the spectator grid's sprites
+def draw_x(surface, x, y, size):
+    margin = size // 4
+    width = max(2, size // 16)
+    pygame.draw.line(surface, RED, 
+                    (x + margin, y + margin),
+                    (x + size - margin, y + size - margin), width)
+    pygame.draw.line(surface, RED,
+                    (x + size - margin, y + margin),
+                    (x + margin, y + size - margin), width)
+
+def draw_o(surface, x, y, size):
+    center_x = x + size // 2
+    center_y = y + size // 2
+    radius = size // 3
+    pygame.draw.circle(surface, BLUE, (center_x, center_y), radius, max(2, size // 16))
+
+def draw_grid(surface, left, top, board_size, size):
+    """Lines of a size x size board whose top left corner is at (left, top)"""
+    cell_size = board_size // size
+    line_width = max(1, 9 // size)
+    for i in range(size + 1):
+        # Vertical lines
+        start_x = left + i * cell_size
+        pygame.draw.line(surface, BLACK,
+                       (start_x, top),
+                       (start_x, top + board_size), line_width)
+        # Horizontal lines
+        start_y = top + i * cell_size
+        pygame.draw.line(surface, BLACK,
+                       (left, start_y),
+                       (left + board_size, start_y), line_width)
+
+def redraw_exposed(event):
+    """Push the whole retained frame again if event says the window was uncovered"""
+    if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+        pygame.display.flip()
+
+class TicTacToe(GameEngine):
+    """Pygame front end: drawing and input on top of GameEngine"""
+    def __init__(self, profile=False, profile_out=None, startup=None, hints=False):
+        # Startup phases are marked on startup (a profiler.StartupTimer) when given
+        self.startup = startup
+        super().__init__()
+        self.mark_startup('engine')
+        
+        # Initialize only the Pygame subsystems the game uses: no audio or joystick
+        pygame.display.init()
+        pygame.font.init()
+        self.mark_startup('pygame display + font')
+        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        pygame.display.set_caption("Tic Tac Toe - Timed Battle")
+        self.frame_clock = pygame.time.Clock()
+        self.mark_startup('window')
+        
+        # Fonts are loaded on first use, see the *_font properties
+        self.text_cache = TextCache()
+        
+        # AI moves are searched off the render thread
+        self.ai_worker = AIWorker(on_done=self.post_ai_done)
+        self.mark_startup('AI worker')
+        
+        # Retained-mode rendering state, see render()
+        self.background = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.rendered_scene = None
+        self.rendered_board = []
+        self.rendered_status = None
+        self.rendered_timer = None
+        
+        # Opt-in frame profiling, F3 toggles the HUD
+        self.profiler = FrameProfiler() if profile or profile_out else None
+        self.profile_out = profile_out
+        self.show_hud = False
+        
+        # Replay of recorded games, see start_replay()
+        self.replay_records = None
+        self.replay_moves = None
+        self.replay_next_step = 0
+        
+        # Move hints for the human, H toggles them; see draw_hints()
+        self.show_hints = hints
+        self.hint_cache = HintCache()
+        self.hint_worker = HintWorker(self.hint_cache, on_update=self.post_hint_update)
+        self.hint_overlays = {}  # (size, color, alpha) -> translucent cell surface
+        self.rendered_hints = {}  # {cell: shade} on screen, see hint_shades()
+        
+    @cached_property
+    def title_font(self):
+        return pygame.font.Font(None, 40)
+        
+    @cached_property
+    def button_font(self):
+        return pygame.font.Font(None, 28)
+        
+    @cached_property
+    def small_font(self):
+        return pygame.font.Font(None, 24)
+        
+    @cached_property
+    def timer_font(self):
+        return pygame.font.Font(None, 36)
+        
+    @cached_property
+    def desc_font(self):
+        return pygame.font.Font(None, 18)
+        
+    @cached_property
+    def hud_font(self):
+        return pygame.font.Font(None, 20)
+        
+    def mark_startup(self, phase):
+        if self.startup is not None:
+            self.startup.mark(phase)
             
-            # Time's up - make random move for human
-            if self.time_remaining <= 0 and not self.auto_move_made:
-                self.auto_move_made = True
-                empty_cells = self.get_empty_cells()
-                
-                if empty_cells:
-                    row, col = random.choice(empty_cells)
-                    self.board[row][col] = 'X'
-                    
-                    # Check for winner
-                    winner = self.check_winner()
-                    if winner:
-                        self.winner = winner
-                        self.state = GameState.GAME_OVER
-                    else:
-                        # Switch to AI turn
-                        self.current_player = Player.AI
-                        self.ai_move_timer = current_time
-                        
-        else:  # AI turn
-            # AI moves after 3 seconds
-            if current_time - self.ai_move_timer >= AI_MOVE_DELAY:
-                move = self.ai_strategic_move()
-                if move:
-                    row, col = move
-                    self.board[row][col] = 'O'
-                    
-                    # Check for winner
-                    winner = self.check_winner()
-                    if winner:
-                        self.winner = winner
-                        self.state = GameState.GAME_OVER
-                    else:
-                        # Switch to human turn
-                        self.current_player = Player.HUMAN
-                        self.turn_start_time = time.time()
-                        self.time_remaining = TIMER_DURATION
-                        self.auto_move_made = False
-        
-    def draw_timer(self):
+    def timed(self, section):
+        """Profiler section context for the given name, a no-op when profiling is off"""
+        return self.profiler.section(section) if self.profiler else NO_SECTION
+        
+    def reset_game(self, seed=None):
+        self.ai_worker.cancel()
+        super().reset_game(seed)
+        
+    def undo(self):
+        # Drop any search of the position being taken back
+        self.ai_worker.cancel()
+        return super().undo()
+        
+    def redo(self):
+        self.ai_worker.cancel()
+        return super().redo()
+        
+    def on_ai_turn(self):
+        # Search during AI_MOVE_DELAY instead of after it
+        if self.replay_records is None:
+            self.ai_worker.start(self)
+        
+    def take_ai_move(self):
+        move = self.ai_worker.result()
+        if move and self.profiler and self.ai_worker.last_search:
+            self.profiler.record_ai(*self.ai_worker.last_search)
+        return move
+        
+    @property
+    def layout(self):
+        return get_layout(self.state, self.size)
+        
+    def timer_state(self):
+        """(text, color, bar progress width) of the countdown, None on the AI's turn
+
+        The bar moves in whole seconds like the text, so the countdown only
+        changes on the second boundaries idle_timeout wakes up for.
+        """
+        if self.current_player != Player.HUMAN:
+            return None
+        seconds = int(self.time_remaining)
+        timer_color = RED if self.time_remaining <= 3 else ORANGE if self.time_remaining <= 5 else GREEN
+        return f"Time: {seconds}s", timer_color, TIMER_BAR_WIDTH * seconds // TIMER_DURATION
+        
+    def draw_timer(self, surface=None):
         """Draw the countdown timer (only for human player)"""
-        if self.current_player == Player.HUMAN:
-            timer_color = RED if self.time_remaining <= 3 else ORANGE if self.time_remaining <= 5 else GREEN
+        surface = self.screen if surface is None else surface
+        timer = self.timer_state()
+        if timer:
+            timer_text, timer_color, progress_width = timer
             
-            timer_text = f"Time: {int(self.time_remaining)}s"
-            timer_surface = self.timer_font.render(timer_text, True, timer_color)
+            timer_surface = self.text_cache.render(self.timer_font, timer_text, timer_color)
             timer_x = (WINDOW_WIDTH - timer_surface.get_width()) // 2
-            self.screen.blit(timer_surface, (timer_x, 130))
+            surface.blit(timer_surface, (timer_x, 130))
             
             # Timer bar
-            bar_width = 200
+            bar_width = TIMER_BAR_WIDTH
             bar_height = 10
             bar_x = (WINDOW_WIDTH - bar_width) // 2
             bar_y = 155
             
             # Background bar
-            pygame.draw.rect(self.screen, GRAY, (bar_x, bar_y, bar_width, bar_height))
+            pygame.draw.rect(surface, GRAY, (bar_x, bar_y, bar_width, bar_height))
             
             # Progress bar
-            progress = self.time_remaining / TIMER_DURATION
-            progress_width = int(bar_width * progress)
-            pygame.draw.rect(self.screen, timer_color, (bar_x, bar_y, progress_width, bar_height))
+            pygame.draw.rect(surface, timer_color, (bar_x, bar_y, progress_width, bar_height))
             
             # Border
-            pygame.draw.rect(self.screen, BLACK, (bar_x, bar_y, bar_width, bar_height), 2)
+            pygame.draw.rect(surface, BLACK, (bar_x, bar_y, bar_width, bar_height), 2)
         else:
             # Show "AI Thinking..." for computer turn
             thinking_text = "AI Thinking..."
-            thinking_surface = self.timer_font.render(thinking_text, True, BLUE)
+            thinking_surface = self.text_cache.render(self.timer_font, thinking_text, BLUE)
             thinking_x = (WINDOW_WIDTH - thinking_surface.get_width()) // 2
-            self.screen.blit(thinking_surface, (thinking_x, 140))
+            surface.blit(thinking_surface, (thinking_x, 140))
         
-    def draw_button(self, x, y, width, height, text, color):
+    def draw_button(self, x, y, width, height, text, color, surface=None):
+        surface = self.screen if surface is None else surface
         button_rect = pygame.Rect(x, y, width, height)
-        pygame.draw.rect(self.screen, color, button_rect)
-        pygame.draw.rect(self.screen, BLACK, button_rect, 2)
+        pygame.draw.rect(surface, color, button_rect)
+        pygame.draw.rect(surface, BLACK, button_rect, 2)
         
-        text_surface = self.button_font.render(text, True, WHITE)
+        text_surface = self.text_cache.render(self.button_font, text, WHITE)
         text_x = x + (width - text_surface.get_width()) // 2
         text_y = y + (height - text_surface.get_height()) // 2
-        self.screen.blit(text_surface, (text_x, text_y))
+        surface.blit(text_surface, (text_x, text_y))
         
         return button_rect
         
-    def draw_menu(self):
-        self.screen.fill(WHITE)
+    def draw_menu(self, surface=None):
+        surface = self.screen if surface is None else surface
+        surface.fill(WHITE)
         
         # Title
-        title_text = self.title_font.render("Tic Tac Toe - Timed Battle", True, BLACK)
+        title_text = self.text_cache.render(self.title_font, "Tic Tac Toe - Timed Battle", BLACK)
         title_x = (WINDOW_WIDTH - title_text.get_width()) // 2
-        self.screen.blit(title_text, (title_x, 50))
+        surface.blit(title_text, (title_x, 50))
         
         # Subtitle
-        subtitle_text = self.small_font.render("10 seconds per turn!", True, RED)
+        subtitle_text = self.text_cache.render(self.small_font, "10 seconds per turn!", RED)
         subtitle_x = (WINDOW_WIDTH - subtitle_text.get_width()) // 2
-        self.screen.blit(subtitle_text, (subtitle_x, 90))
+        surface.blit(subtitle_text, (subtitle_x, 90))
         
         # Description
-        desc_text = self.small_font.render("Choose Difficulty:", True, GRAY)
+        desc_text = self.text_cache.render(self.small_font, "Choose Difficulty:", GRAY)
         desc_x = (WINDOW_WIDTH - desc_text.get_width()) // 2
-        self.screen.blit(desc_text, (desc_x, 130))
+        surface.blit(desc_text, (desc_x, 130))
         
         # Buttons
-        button_width = 200
-        button_height = 50
-        button_x = (WINDOW_WIDTH - button_width) // 2
-        
-        easy_button = self.draw_button(button_x, 170, button_width, button_height, "Easy", GREEN)
-        medium_button = self.draw_button(button_x, 240, button_width, button_height, "Medium", BLUE)
-        hard_button = self.draw_button(button_x, 310, button_width, button_height, "Hard", RED)
-        quit_button = self.draw_button(button_x, 420, button_width, button_height, "Quit", GRAY)
+        buttons = get_layout(GameState.MENU, self.size).buttons
+        variant_text = f"Board: {self.size}x{self.size}, {self.win_length} in a row"
+        self.draw_button(*buttons['easy'], "Easy", GREEN, surface)
+        self.draw_button(*buttons['medium'], "Medium", BLUE, surface)
+        self.draw_button(*buttons['hard'], "Hard", RED, surface)
+        self.draw_button(*buttons['mcts'], "MCTS", PURPLE, surface)
+        self.draw_button(*buttons['board'], variant_text, ORANGE, surface)
+        self.draw_button(*buttons['quit'], "Quit", GRAY, surface)
         
         # Difficulty descriptions - positioned below each button
         descriptions = [
             "AI makes mistakes often",
             "AI plays smart strategy", 
-            "Perfect AI - Advanced tactics"
+            "Perfect AI - Advanced tactics",
+            "Tree search - Strongest on big boards"
         ]
         
-        desc_font = pygame.font.Font(None, 18)
         for i, desc in enumerate(descriptions):
-            desc_surface = desc_font.render(desc, True, GRAY)
+            desc_surface = self.text_cache.render(self.desc_font, desc, GRAY)
             desc_x = (WINDOW_WIDTH - desc_surface.get_width()) // 2
-            desc_y = 225 + (i * 70)  # Position below each button
-            self.screen.blit(desc_surface, (desc_x, desc_y))
-        
-        return {
-            'easy': easy_button,
-            'medium': medium_button,
-            'hard': hard_button,
-            'quit': quit_button
-        }
-        
-    def draw_x(self, x, y, size):
-        margin = size // 4
-        pygame.draw.line(self.screen, RED, 
-                        (x + margin, y + margin),
-                        (x + size - margin, y + size - margin), 6)
-        pygame.draw.line(self.screen, RED,
-                        (x + size - margin, y + margin),
-                        (x + margin, y + size - margin), 6)
-                        
-    def draw_o(self, x, y, size):
-        center_x = x + size // 2
-        center_y = y + size // 2
-        radius = size // 3
-        pygame.draw.circle(self.screen, BLUE, (center_x, center_y), radius, 6)
-            
-    def draw_game(self):
-        self.screen.fill(WHITE)
+            desc_y = 209 + (i * 65)  # Position below each button
+            surface.blit(desc_surface, (desc_x, desc_y))
         
-        # Title
-        title_text = self.title_font.render("Tic Tac Toe", True, BLACK)
-        title_x = (WINDOW_WIDTH - title_text.get_width()) // 2
-        self.screen.blit(title_text, (title_x, 20))
-        
-        # Difficulty display
-        diff_text = self.small_font.render(f"Difficulty: {self.difficulty.name}", True, GRAY)
-        diff_x = (WINDOW_WIDTH - diff_text.get_width()) // 2
-        self.screen.blit(diff_text, (diff_x, 50))
+        return buttons
         
-        # Current player
+    def draw_x(self, x, y, size, surface=None):
+        draw_x(self.screen if surface is None else surface, x, y, size)
+                        
+    def draw_o(self, x, y, size, surface=None):
+        draw_o(self.screen if surface is None else surface, x, y, size)
+        
+    def cell_rect(self, row, col):
+        return get_layout(GameState.PLAYING, self.size).cell_rect(row, col)
+        
+    def draw_mark(self, row, col, surface=None):
+        cell = self.cell_rect(row, col)
+        if self.board[row][col] == 'X':
+            self.draw_x(cell.x, cell.y, cell.width, surface)
+        elif self.board[row][col] == 'O':
+            self.draw_o(cell.x, cell.y, cell.width, surface)
+            
+    def visible_hints(self):
+        """{cell: Hint} found so far for the human's move, empty when hints are not shown"""
+        if (not self.show_hints or self.state != GameState.PLAYING or self.current_player != Player.HUMAN
+                or self.replay_records is not None):
+            return {}
+        hints = self.hint_cache.get(hint_key(self))
+        return hints.copy() if hints else {}
+        
+    def hint_overlay(self, size, color, alpha):
+        overlay = self.hint_overlays.get((size, color, alpha))
+        if overlay is None:
+            overlay = self.hint_overlays[(size, color, alpha)] = pygame.Surface((size, size))
+            overlay.fill(color)
+            overlay.set_alpha(alpha)
+        return overlay
+        
+    def hint_shades(self):
+        """{cell: (color, alpha, label)} of the visible hints
+
+        Exact results are green (win), blue (draw) or red (loss), stronger
+        the sooner the game ends. Heuristic scores are tinted relative to
+        the largest one in the position, so small evaluations still show.
+        """
+        hints = self.visible_hints()
+        scale = max((abs(hint.score) for hint in hints.values() if hint.outcome is None), default=0)
+        shades = {}
+        for cell, hint in hints.items():
+            if hint.outcome == 'draw':
+                shades[cell] = (BLUE, 60, "D")
+            elif hint.outcome is not None:
+                color = GREEN if hint.outcome == 'win' else RED
+                label = f"{'W' if hint.outcome == 'win' else 'L'}{hint.plies}"
+                shades[cell] = (color, max(60, 170 - 15 * (hint.plies - 1)), label)
+            else:
+                alpha = int(120 * abs(hint.score) / scale) if scale else 0
+                shades[cell] = (GREEN if hint.score > 0 else RED, alpha, None)
+        return shades
+        
+    def draw_hint(self, row, col, shade, surface=None):
+        """Shade an empty cell as hint_shades() says"""
+        surface = self.screen if surface is None else surface
+        color, alpha, label = shade
+        cell = self.cell_rect(row, col)
+        inset = max(2, 9 // self.size)  # Clear of the grid lines
+        surface.blit(self.hint_overlay(cell.width - 2 * inset, color, alpha), (cell.x + inset, cell.y + inset))
+        
+        # Exact results get a label when the cells are big enough to read one
+        if label is not None and cell.width >= 40:
+            text_surface = self.text_cache.render(self.desc_font, label, BLACK)
+            surface.blit(text_surface, (cell.x + inset + 3, cell.y + inset + 3))
+            
+    def draw_hints(self, surface=None):
+        for cell, shade in self.hint_shades().items():
+            row, col = divmod(cell, self.size)
+            if self.board[row][col] == '':
+                self.draw_hint(row, col, shade, surface)
+                
+    def draw_status(self, surface=None):
+        """Draw whose turn it is"""
+        surface = self.screen if surface is None else surface
         if self.current_player == Player.HUMAN:
             player_text = "Your Turn (X)"
             color = RED
@@ -465,55 +464,59 @@ class TicTacToe:
             player_text = "Computer's Turn (O)"
             color = BLUE
             
-        player_surface = self.small_font.render(player_text, True, color)
+        player_surface = self.text_cache.render(self.small_font, player_text, color)
         player_x = (WINDOW_WIDTH - player_surface.get_width()) // 2
-        self.screen.blit(player_surface, (player_x, 75))
+        surface.blit(player_surface, (player_x, 75))
         
-        # Timer
-        self.draw_timer()
+    def draw_game_background(self, surface):
+        """Draw the parts of the game screen that stay put during a game"""
+        surface.fill(WHITE)
         
-        # Draw board
-        for i in range(4):
-            # Vertical lines
-            start_x = BOARD_OFFSET_X + i * CELL_SIZE
-            pygame.draw.line(self.screen, BLACK,
-                           (start_x, BOARD_OFFSET_Y),
-                           (start_x, BOARD_OFFSET_Y + BOARD_SIZE), 3)
-            # Horizontal lines
-            start_y = BOARD_OFFSET_Y + i * CELL_SIZE
-            pygame.draw.line(self.screen, BLACK,
-                           (BOARD_OFFSET_X, start_y),
-                           (BOARD_OFFSET_X + BOARD_SIZE, start_y), 3)
+        # Title
+        title_text = self.text_cache.render(self.title_font, "Tic Tac Toe", BLACK)
+        title_x = (WINDOW_WIDTH - title_text.get_width()) // 2
+        surface.blit(title_text, (title_x, 20))
         
-        # Draw X's and O's
-        for i in range(3):
-            for j in range(3):
-                x = BOARD_OFFSET_X + j * CELL_SIZE
-                y = BOARD_OFFSET_Y + i * CELL_SIZE
-                
-                if self.board[i][j] == 'X':
-                    self.draw_x(x, y, CELL_SIZE)
-                elif self.board[i][j] == 'O':
-                    self.draw_o(x, y, CELL_SIZE)
+        # Difficulty display
+        diff_text = self.text_cache.render(self.small_font, f"Difficulty: {self.difficulty.name}", GRAY)
+        diff_x = (WINDOW_WIDTH - diff_text.get_width()) // 2
+        surface.blit(diff_text, (diff_x, 50))
+        
+        # Draw board
+        layout = get_layout(GameState.PLAYING, self.size)
+        board_rect = layout.board_rect
+        draw_grid(surface, board_rect.x, board_rect.y, board_rect.width, self.size)
         
         # Bottom buttons
-        button_width = 100
-        button_height = 40
-        button_y = BOARD_OFFSET_Y + BOARD_SIZE + 30
+        self.draw_button(*layout.buttons['menu'], "Menu", GRAY, surface)
+        self.draw_button(*layout.buttons['restart'], "Restart", GREEN, surface)
+        self.draw_button(*layout.buttons['undo'], "Undo", BLUE, surface)
+        self.draw_button(*layout.buttons['redo'], "Redo", BLUE, surface)
         
-        menu_x = (WINDOW_WIDTH // 2) - button_width - 10
-        restart_x = (WINDOW_WIDTH // 2) + 10
+        return layout.buttons
+            
+    def draw_game(self, surface=None):
+        surface = self.screen if surface is None else surface
+        buttons = self.draw_game_background(surface)
         
-        menu_button = self.draw_button(menu_x, button_y, button_width, button_height, "Menu", GRAY)
-        restart_button = self.draw_button(restart_x, button_y, button_width, button_height, "Restart", GREEN)
+        # Current player and timer
+        self.draw_status(surface)
+        self.draw_timer(surface)
         
-        return {
-            'menu': menu_button,
-            'restart': restart_button
-        }
+        # Draw X's and O's
+        for i in range(self.size):
+            for j in range(self.size):
+                self.draw_mark(i, j, surface)
+                
+        # Hint shading on the empty cells
+        if self.show_hints:
+            self.draw_hints(surface)
+        
+        return buttons
             
-    def draw_game_over(self):
-        buttons = self.draw_game()
+    def draw_game_over(self, surface=None):
+        surface = self.screen if surface is None else surface
+        buttons = self.draw_game(surface)
         
         # Game over message
         if self.winner == 'X':
@@ -526,105 +529,332 @@ class TicTacToe:
             message = "It's a Tie!"
             color = BLUE
             
-        message_surface = self.title_font.render(message, True, color)
+        message_surface = self.text_cache.render(self.title_font, message, color)
         message_x = (WINDOW_WIDTH - message_surface.get_width()) // 2
         message_y = 100
         
         # Background for message
-        pygame.draw.rect(self.screen, WHITE, (message_x - 10, message_y - 5, 
+        pygame.draw.rect(surface, WHITE, (message_x - 10, message_y - 5, 
                                             message_surface.get_width() + 20, 
                                             message_surface.get_height() + 10))
-        pygame.draw.rect(self.screen, BLACK, (message_x - 10, message_y - 5, 
+        pygame.draw.rect(surface, BLACK, (message_x - 10, message_y - 5, 
                                             message_surface.get_width() + 20, 
                                             message_surface.get_height() + 10), 2)
         
-        self.screen.blit(message_surface, (message_x, message_y))
+        surface.blit(message_surface, (message_x, message_y))
         
         return buttons
         
-    def handle_click(self, pos):
-        if self.state == GameState.MENU:
-            buttons = self.draw_menu()
+    def render(self):
+        """Retained-mode frame: redraw and push only the regions that changed
+
+        Everything that stays put is composed once onto self.background.
+        New marks are added to it as they are placed, and the status line
+        and timer are restored from it and redrawn only when their content
+        changes. A change of screen or a cleared board recomposes it all.
+        """
+        board = [row[:] for row in self.board]
+        removed = any(old and not new
+                      for old_row, new_row in zip(self.rendered_board, board)
+                      for old, new in zip(old_row, new_row))
+        scene = (self.state, self.size, self.win_length, self.difficulty)
+        if scene != self.rendered_scene or removed or len(board) != len(self.rendered_board):
+            if self.state == GameState.MENU:
+                self.draw_menu(self.background)
+            elif self.state == GameState.PLAYING:
+                self.draw_game_background(self.background)
+                for i in range(self.size):
+                    for j in range(self.size):
+                        self.draw_mark(i, j, self.background)
+            else:
+                self.draw_game_over(self.background)
+            self.screen.blit(self.background, (0, 0))
+            shades = self.hint_shades()
+            if self.state == GameState.PLAYING:
+                self.draw_status()
+                self.draw_timer()
+                for cell, shade in shades.items():
+                    row, col = divmod(cell, self.size)
+                    if board[row][col] == '':
+                        self.draw_hint(row, col, shade)
+            self.rendered_hints = shades
+            self.rendered_scene = scene
+            self.rendered_board = board
+            self.rendered_status = self.current_player
+            self.rendered_timer = self.timer_state()
+            with self.timed('flip'):
+                pygame.display.flip()
+            return
+            
+        # Menu and game over screens are static until the scene changes
+        if self.state != GameState.PLAYING:
+            return
+            
+        # Cells whose mark or hint shade changed are restored from the
+        # background, which holds the marks, with any hint shaded over on
+        # the screen only. A new strongest heuristic score changes the
+        # shade of every heuristic cell.
+        dirty = []
+        shades = self.hint_shades()
+        rendered_hints = self.rendered_hints
+        for i, (old_row, new_row) in enumerate(zip(self.rendered_board, board)):
+            for j, (old, new) in enumerate(zip(old_row, new_row)):
+                shade = shades.get(i * self.size + j)
+                if old != new or shade != rendered_hints.get(i * self.size + j):
+                    cell = self.cell_rect(i, j)
+                    if old != new:
+                        self.draw_mark(i, j, self.background)
+                    self.screen.blit(self.background, cell, cell)
+                    if shade is not None and new == '':
+                        self.draw_hint(i, j, shade)
+                    dirty.append(cell)
+        self.rendered_board = board
+        self.rendered_hints = shades
+        
+        if self.current_player != self.rendered_status:
+            self.screen.blit(self.background, STATUS_RECT, STATUS_RECT)
+            self.draw_status()
+            dirty.append(STATUS_RECT)
+            self.rendered_status = self.current_player
+            
+        timer = self.timer_state()
+        if timer != self.rendered_timer:
+            self.screen.blit(self.background, TIMER_RECT, TIMER_RECT)
+            self.draw_timer()
+            dirty.append(TIMER_RECT)
+            self.rendered_timer = timer
             
-            if buttons['easy'].collidepoint(pos):
-                self.difficulty = Difficulty.EASY
-                self.reset_game()
-            elif buttons['medium'].collidepoint(pos):
-                self.difficulty = Difficulty.MEDIUM
-                self.reset_game()
-            elif buttons['hard'].collidepoint(pos):
-                self.difficulty = Difficulty.HARD
-                self.reset_game()
-            elif buttons['quit'].collidepoint(pos):
-                return False
+        if dirty:
+            with self.timed('flip'):
+                pygame.display.update(dirty)
                 
-        elif self.state == GameState.PLAYING:
-            buttons = self.draw_game()
+    def draw_hud(self):
+        """Draw the profiler overlay: recent frame time bars, percentiles and AI stats"""
+        self.screen.blit(self.background, HUD_RECT, HUD_RECT)
+        if self.show_hud:
+            pygame.draw.rect(self.screen, LIGHT_BLUE, HUD_RECT)
             
-            if buttons['menu'].collidepoint(pos):
-                self.state = GameState.MENU
-            elif buttons['restart'].collidepoint(pos):
-                self.reset_game()
-            elif self.current_player == Player.HUMAN:
-                # Check board click only during human turn
-                if (BOARD_OFFSET_X <= pos[0] <= BOARD_OFFSET_X + BOARD_SIZE and
-                    BOARD_OFFSET_Y <= pos[1] <= BOARD_OFFSET_Y + BOARD_SIZE):
-                    
-                    col = (pos[0] - BOARD_OFFSET_X) // CELL_SIZE
-                    row = (pos[1] - BOARD_OFFSET_Y) // CELL_SIZE
-                    
-                    if 0 <= row < 3 and 0 <= col < 3 and self.board[row][col] == '':
-                        self.board[row][col] = 'X'
-                        
-                        winner = self.check_winner()
-                        if winner:
-                            self.winner = winner
-                            self.state = GameState.GAME_OVER
-                        else:
-                            self.current_player = Player.AI
-                            self.ai_move_timer = time.time()
-                            
-        elif self.state == GameState.GAME_OVER:
-            buttons = self.draw_game_over()
+            # One bar per recent frame, with a line at the 60 FPS budget
+            frames = list(self.profiler.frames)[-HUD_FRAMES:]
+            bar_bottom = HUD_RECT.bottom - 5
+            bar_height = HUD_RECT.height - 10
+            for i, frame in enumerate(frames):
+                height = min(bar_height, int(bar_height * sum(frame.values()) / HUD_FULL_SCALE))
+                color = RED if sum(frame.values()) > 1 / MAX_FPS else GREEN
+                pygame.draw.rect(self.screen, color, (5 + i * 2, bar_bottom - height, 2, height))
+            budget_y = bar_bottom - int(bar_height * (1 / MAX_FPS) / HUD_FULL_SCALE)
+            pygame.draw.line(self.screen, GRAY, (5, budget_y), (5 + HUD_FRAMES * 2, budget_y))
             
-            if buttons['menu'].collidepoint(pos):
-                self.state = GameState.MENU
-            elif buttons['restart'].collidepoint(pos):
-                self.reset_game()
+            # Frame and section percentiles, AI search cost
+            frame_times = [sum(frame.values()) for frame in frames]
+            lines = [f"frame p50 {percentile(frame_times, 0.5) * 1000:.2f} ms"
+                     f"  p99 {percentile(frame_times, 0.99) * 1000:.2f} ms"]
+            lines.append("  ".join(f"{name} {percentile([frame.get(name, 0.0) for frame in frames], 0.5) * 1000:.2f}"
+                                   for name in ('events', 'update', 'draw', 'flip')))
+            if self.profiler.ai_searches:
+                seconds, nodes = self.profiler.ai_searches[-1]
+                if self.difficulty == Difficulty.MCTS:
+                    lines.append(f"AI last {seconds * 1000:.1f} ms, {nodes} playouts"
+                                 f" ({nodes / max(seconds, 1e-9):.0f}/s)")
+                else:
+                    lines.append(f"AI last {seconds * 1000:.1f} ms, {nodes} nodes")
+            for i, line in enumerate(lines):
+                text_surface = self.hud_font.render(line, True, BLACK)
+                self.screen.blit(text_surface, (5 + HUD_FRAMES * 2 + 10, HUD_RECT.y + 8 + i * 22))
                 
+        with self.timed('flip'):
+            pygame.display.update(HUD_RECT)
+        
+    def handle_click(self, pos):
+        hit = self.layout.hit_test(pos)
+        if hit is None:
+            return True
+        kind, target = hit
+        
+        if self.replay_records is not None:
+            # Replays only stop from the Menu button
+            if target == 'menu':
+                self.stop_replay()
+            return True
+        
+        if kind == 'cell':
+            # Check board click only during human turn
+            row, col = target
+            if (self.state == GameState.PLAYING and self.current_player == Player.HUMAN and
+                    self.board[row][col] == ''):
+                self.make_move(row, col)
+        elif target in ('easy', 'medium', 'hard', 'mcts'):
+            self.difficulty = Difficulty[target.upper()]
+            self.reset_game()
+        elif target == 'board':
+            # Cycle through the board variants
+            index = BOARD_VARIANTS.index((self.size, self.win_length))
+            self.set_board_variant(*BOARD_VARIANTS[(index + 1) % len(BOARD_VARIANTS)])
+        elif target == 'quit':
+            return False
+        elif target == 'menu':
+            self.ai_worker.cancel()
+            self.state = GameState.MENU
+        elif target == 'restart':
+            self.reset_game()
+        elif target == 'undo':
+            self.undo()
+        elif target == 'redo':
+            self.redo()
+            
         return True
         
     def update(self):
-        if self.state == GameState.PLAYING:
+        if self.replay_records is not None:
+            self.update_replay()
+        elif self.state == GameState.PLAYING:
             self.update_timer()
+            
+        # Keep the hint worker on the position the human has to move in
+        if self.show_hints and self.state == GameState.PLAYING and self.current_player == Player.HUMAN:
+            self.hint_worker.request(self)
+        elif self.hint_worker.busy:
+            self.hint_worker.cancel()
+            
+    def start_replay(self, records):
+        """Step through recorded games on screen, one move every REPLAY_STEP_DELAY"""
+        self.replay_records = iter(records)
+        self.replay_moves = None
+        self.replay_next_step = self.clock.now()
+        
+    def stop_replay(self):
+        self.replay_records = None
+        self.replay_moves = None
+        self.state = GameState.MENU
+        
+    def update_replay(self):
+        now = self.clock.now()
+        if now < self.replay_next_step:
+            return
+        self.replay_next_step = now + REPLAY_STEP_DELAY
+        if self.replay_moves is not None and next(self.replay_moves, None) is not None:
+            return
+            
+        # The last game is over: its final position stays up for this step
+        record = next(self.replay_records, None)
+        if record is None:
+            self.stop_replay()
+        else:
+            self.replay_moves = replay(record, self)
+            
+    def post_hint_update(self):
+        """Wake the main loop to show a new hint (called on the hint worker thread)"""
+        if pygame.display.get_init():
+            pygame.event.post(pygame.event.Event(HINT_EVENT))
+            
+    def post_ai_done(self):
+        """Wake the main loop when the AI worker finishes (called on the worker thread)"""
+        if pygame.display.get_init():
+            pygame.event.post(pygame.event.Event(AI_DONE_EVENT))
+            
+    def idle_timeout(self):
+        """Milliseconds until the screen can next change on its own, None if only input can change it"""
+        now = self.clock.now()
+        if self.replay_records is not None:
+            return max(0, int((self.replay_next_step - now) * 1000)) + 1
+        deadline = self.next_deadline()
+        if deadline is None:
+            return None
+            
+        if self.current_player == Player.HUMAN:
+            # Next whole second of the countdown, the timeout itself included
+            remaining = max(0, deadline - now)
+            wait = remaining % 1 or 1
+        else:
+            # The AI moves at its delay deadline, or when the worker posts
+            # AI_DONE_EVENT if it is still searching by then
+            wait = deadline - now
+            if wait <= 0:
+                return None if self.ai_worker.busy else 0
+        return int(wait * 1000) + 1
+        
+    def wait_for_events(self):
+        """Sleep until input arrives or idle_timeout expires, then return pending events"""
+        timeout = self.idle_timeout()
+        if timeout is None:
+            events = [pygame.event.wait()]
+        elif timeout > 0:
+            events = [pygame.event.wait(timeout)]
+        else:
+            events = []
+        return [event for event in events + pygame.event.get() if event.type != pygame.NOEVENT]
                     
     def run(self):
         running = True
         
+        # The first frame goes up before waiting for any input
+        self.render()
+        if self.startup is not None:
+            self.mark_startup('first frame')
+            print(self.startup.report())
+        
         while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:  # Left click
-                        running = self.handle_click(event.pos)
-                        
-            self.update()
+            events = self.wait_for_events()
+            hud_changed = False
             
-            if self.state == GameState.MENU:
-                self.draw_menu()
-            elif self.state == GameState.PLAYING:
-                self.draw_game()
-            elif self.state == GameState.GAME_OVER:
-                self.draw_game_over()
-                
-            pygame.display.flip()
-            self.clock.tick(60)
+            with self.timed('events'):
+                for event in events:
+                    if event.type == pygame.QUIT:
+                        running = False
+                    elif event.type == pygame.MOUSEBUTTONDOWN:
+                        if event.button == 1:  # Left click
+                            running = self.handle_click(event.pos)
+                    elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3 and self.profiler:
+                        self.show_hud = not self.show_hud
+                        hud_changed = True
+                    elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                        self.show_hints = not self.show_hints
+                    else:
+                        redraw_exposed(event)
+                        
+            with self.timed('update'):
+                self.update()
+            with self.timed('draw'):
+                self.render()
+                if self.show_hud or hud_changed:
+                    self.draw_hud()
+            if self.profiler:
+                self.profiler.end_frame()
+            self.frame_clock.tick(MAX_FPS)  # Caps bursts of input; idle frames sleep in wait_for_events
             
+        if self.profiler and self.profile_out:
+            self.profiler.export(self.profile_out)
+        if self.recorder is not None:
+            self.recorder.close()
+        self.ai_worker.shutdown()
+        self.hint_worker.shutdown()
         pygame.quit()
         sys.exit()
 
-if __name__ == "__main__":
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if '--headless' in argv:
+        return run_headless(argv)
+    parser = argparse.ArgumentParser(description="Timed Tic Tac Toe against the computer")
+    parser.add_argument('--profile', action='store_true',
+                        help="time every frame and the AI; press F3 in game for the HUD")
+    parser.add_argument('--profile-out', metavar='PATH',
+                        help="write profile stats on exit (.json, otherwise CSV); implies --profile")
+    records = parser.add_mutually_exclusive_group()
+    records.add_argument('--record', metavar='PATH', help="append every finished game to a record file")
+    records.add_argument('--replay', metavar='PATH', help="step through the games in a record file")
+    parser.add_argument('--hints', action='store_true',
+                        help="start with move hints shown; press H in game to toggle them")
+    parser.add_argument('--startup-times', action='store_true',
+                        help="print how long each startup phase took up to the first frame "
+                             "(python -X importtime covers the imports)")
+    # Listed for --help only: run_headless takes over before these options are parsed
+    parser.add_argument('--headless', action='store_true',
+                        help="play in the terminal without SDL; takes terminal_game.py's options")
+    args = parser.parse_args(argv)
+    startup = StartupTimer() if args.startup_times else None
+    
     print("🎮 Timed Tic Tac Toe Battle")
     print("=" * 30)
     print("⏰ NEW FEATURES:")
@@ -636,7 +866,15 @@ if __name__ == "__main__":
     print("• Easy: 70% random moves")
     print("• Medium: Smart blocking & winning")
     print("• Hard: Advanced tactics + forks")
+    print("• MCTS: Tree search for the big boards")
     print("\nStarting game...")
     
-    game = TicTacToe()
-    game.run()
\ No newline at end of file
+    game = TicTacToe(profile=args.profile, profile_out=args.profile_out, startup=startup, hints=args.hints)
+    if args.record:
+        game.recorder = GameRecordWriter(args.record)
+    if args.replay:
+        game.start_replay(read_records(args.replay))
+    game.run()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,232 @@
+"""Headless AI-vs-AI self-play across all CPU cores
+
+Runs N games for every (X difficulty, O difficulty) pairing using the same
+ai_strategic_move logic as the game, with no rendering and no AI_MOVE_DELAY.
+Work is handed to a process pool in chunks and results are folded into
+running totals as they stream back, so memory stays flat however many games
+are played.
+
+    python self_play.py --games 100000
+    python self_play.py --games 10000 --pairing HARD:EASY --pairing EASY:HARD
+    python self_play.py --games 100 --size 5 --win-length 4
+    python self_play.py --games 20 --size 5 --win-length 4 --pairing MCTS:HARD --think-time 0.2
+    python self_play.py --games 100000 --record games.ttt
+    python self_play.py --games 10000 --timeout-rate 0.2    # timed games on a virtual clock
+"""
+import argparse
+import math
+import os
+import random
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+from game_engine import TIMER_DURATION, Difficulty, GameEngine, GameState, Player, VirtualClock
+from game_record import GameRecord, GameRecordWriter, encode_record
+
+DEFAULT_CHUNK_SIZE = 500  # Games per task sent to a worker
+LATENCY_BUCKET_RATIO = 1.05  # Histogram buckets are 5% wide
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram with bounded memory"""
+    def __init__(self, counts=None):
+        self.counts = Counter(counts or {})
+
+    def add(self, nanoseconds):
+        self.counts[int(math.log(max(nanoseconds, 1), LATENCY_BUCKET_RATIO))] += 1
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+
+    def total(self):
+        return sum(self.counts.values())
+
+    def percentile(self, fraction):
+        """Return the latency in microseconds at the given fraction (0-1)"""
+        total = self.total()
+        if not total:
+            return 0.0
+        threshold = fraction * total
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= threshold:
+                return LATENCY_BUCKET_RATIO ** (bucket + 1) / 1000
+        return 0.0
+
+class PairingStats:
+    """Running totals for one X-vs-O difficulty pairing"""
+    def __init__(self):
+        self.games = 0
+        self.x_wins = 0
+        self.o_wins = 0
+        self.ties = 0
+        self.cpu_seconds = 0.0
+        self.latency = LatencyHistogram()
+
+    def add_chunk(self, x_wins, o_wins, ties, cpu_seconds, latency_counts):
+        self.games += x_wins + o_wins + ties
+        self.x_wins += x_wins
+        self.o_wins += o_wins
+        self.ties += ties
+        self.cpu_seconds += cpu_seconds
+        self.latency.merge(LatencyHistogram(latency_counts))
+
+def play_game(engine, x_difficulty, o_difficulty, latency):
+    """Play one AI-vs-AI game to the end and return the winner"""
+    engine.reset_game()
+    while engine.state == GameState.PLAYING:
+        if engine.current_player == Player.HUMAN:
+            engine.difficulty, mark = x_difficulty, 'X'
+        else:
+            engine.difficulty, mark = o_difficulty, 'O'
+        start = time.perf_counter_ns()
+        row, col = engine.ai_strategic_move(mark)
+        latency.add(time.perf_counter_ns() - start)
+        engine.make_move(row, col)
+    return engine.winner
+
+def play_timed_game(engine, x_difficulty, o_difficulty, latency, timeout_rate):
+    """Play one game through update_timer on the engine's VirtualClock
+
+    X thinks for a random part of its turn, or lets the timer run out with
+    probability timeout_rate; O moves when AI_MOVE_DELAY is up. The clock
+    jumps straight to each deadline, so no real time is waited.
+    """
+    clock = engine.clock
+    engine.reset_game()
+    while engine.state == GameState.PLAYING:
+        if engine.current_player == Player.HUMAN:
+            if random.random() < timeout_rate:
+                clock.advance_to(engine.next_deadline())
+                engine.update_timer()  # Random auto-move
+                continue
+            engine.difficulty = x_difficulty
+            start = time.perf_counter_ns()
+            row, col = engine.ai_strategic_move('X')
+            latency.add(time.perf_counter_ns() - start)
+            clock.advance(random.uniform(0, TIMER_DURATION))
+            engine.update_timer()
+            if engine.current_player == Player.HUMAN and not engine.auto_move_made:
+                engine.make_move(row, col)
+        else:
+            engine.difficulty = o_difficulty
+            clock.advance_to(engine.next_deadline())
+            start = time.perf_counter_ns()
+            engine.update_timer()
+            latency.add(time.perf_counter_ns() - start)
+    return engine.winner
+
+_engine = None
+_record = False
+_timeout_rate = None
+
+def _init_worker(size, win_length, think_time, record, timeout_rate):
+    global _engine, _record, _timeout_rate
+    _engine = GameEngine(size, win_length, VirtualClock() if timeout_rate is not None else None)
+    _engine.mcts_workers = 1  # The pool already keeps every core busy
+    if think_time is not None:
+        _engine.search_time_budget = think_time
+    _record = record
+    _timeout_rate = timeout_rate
+
+def run_chunk(task):
+    """Worker entry point: play a chunk of games and return aggregate counts"""
+    x_value, o_value, games, seed = task
+    x_difficulty, o_difficulty = Difficulty(x_value), Difficulty(o_value)
+    random.seed(seed)
+    latency = LatencyHistogram()
+    results = Counter()
+    records = []
+    start = time.process_time()
+    for _ in range(games):
+        if _timeout_rate is None:
+            winner = play_game(_engine, x_difficulty, o_difficulty, latency)
+        else:
+            winner = play_timed_game(_engine, x_difficulty, o_difficulty, latency, _timeout_rate)
+        results[winner] += 1
+        if _record:
+            # Records carry one difficulty, the O side's
+            _engine.difficulty = o_difficulty
+            records.append(encode_record(GameRecord.from_engine(_engine)))
+    cpu_seconds = time.process_time() - start
+    return (x_value, o_value, b''.join(records), results['X'], results['O'], results['tie'],
+            cpu_seconds, dict(latency.counts))
+
+def generate_tasks(pairings, games, chunk_size, seed):
+    """Yield (x, o, games, seed) chunks lazily so the task queue stays small"""
+    rng = random.Random(seed)
+    for x_difficulty, o_difficulty in pairings:
+        remaining = games
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            remaining -= size
+            yield x_difficulty.value, o_difficulty.value, size, rng.getrandbits(64)
+
+def simulate(pairings, games, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, seed=0,
+             size=3, win_length=3, think_time=None, record_path=None, timeout_rate=None):
+    """Run games per pairing on a process pool, returns ({pairing: stats}, wall seconds)
+
+    With record_path every game is appended to that game record file. With
+    timeout_rate games run through the turn timers on a virtual clock, see
+    play_timed_game.
+    """
+    stats = {pairing: PairingStats() for pairing in pairings}
+    writer = GameRecordWriter(record_path) if record_path else None
+    start = time.perf_counter()
+    with Pool(workers or os.cpu_count(), initializer=_init_worker,
+              initargs=(size, win_length, think_time, writer is not None, timeout_rate)) as pool:
+        tasks = generate_tasks(pairings, games, chunk_size, seed)
+        for x_value, o_value, records, *totals in pool.imap_unordered(run_chunk, tasks):
+            stats[(Difficulty(x_value), Difficulty(o_value))].add_chunk(*totals)
+            if writer is not None:
+                writer.write_encoded(records)
+    if writer is not None:
+        writer.close()
+    return stats, time.perf_counter() - start
+
+def parse_pairing(text):
+    x_name, o_name = text.upper().split(':')
+    return Difficulty[x_name], Difficulty[o_name]
+
+def print_report(stats, wall_seconds):
+    print(f"{'X vs O':<16}{'games':>10}{'X win':>8}{'O win':>8}{'tie':>8}"
+          f"{'games/cpu-s':>13}{'p50 us':>9}{'p90 us':>9}{'p99 us':>9}")
+    total_games = 0
+    for (x_difficulty, o_difficulty), pairing in stats.items():
+        total_games += pairing.games
+        games = pairing.games or 1
+        rate = pairing.games / pairing.cpu_seconds if pairing.cpu_seconds else 0
+        print(f"{x_difficulty.name + ':' + o_difficulty.name:<16}{pairing.games:>10}"
+              f"{pairing.x_wins / games:>8.1%}{pairing.o_wins / games:>8.1%}{pairing.ties / games:>8.1%}"
+              f"{rate:>13.0f}{pairing.latency.percentile(0.5):>9.1f}"
+              f"{pairing.latency.percentile(0.9):>9.1f}{pairing.latency.percentile(0.99):>9.1f}")
+    print(f"\n{total_games} games in {wall_seconds:.2f}s ({total_games / wall_seconds:.0f} games/s)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless AI-vs-AI Tic Tac Toe self-play")
+    parser.add_argument('--games', type=int, default=1000, help="games per pairing")
+    parser.add_argument('--pairing', action='append', type=parse_pairing,
+                        help="X:O difficulties, e.g. HARD:EASY (default: all pairings but MCTS)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=None, help="default: all cores")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--size', type=int, default=3, help="board is size x size")
+    parser.add_argument('--win-length', type=int, default=3, help="marks in a row to win")
+    parser.add_argument('--think-time', type=float, default=None,
+                        help="HARD and MCTS search budget per move in seconds (default: game setting)")
+    parser.add_argument('--record', metavar='PATH', help="append every game to a game record file")
+    parser.add_argument('--timeout-rate', type=float, default=None,
+                        help="play through the turn timers on a virtual clock, X timing out this often")
+    args = parser.parse_args(argv)
+
+    # MCTS spends its whole think time on every move, so it only plays when asked for
+    classic = [difficulty for difficulty in Difficulty if difficulty != Difficulty.MCTS]
+    pairings = args.pairing or [(x, o) for x in classic for o in classic]
+    stats, wall_seconds = simulate(pairings, args.games, args.chunk_size, args.workers, args.seed,
+                                   args.size, args.win_length, args.think_time, args.record,
+                                   args.timeout_rate)
+    print_report(stats, wall_seconds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Retrograde perfect-play solver and its memory-mapped lookup table
+
+solve() walks every position of a size x size board with a legal stone
+count, from full boards back to the empty one, one layer of stones at a
+time. Each layer is a NumPy array of position indexes, so a child's value
+is a single gather: a position's value is the best of its children's, and
+the layer below only needs the layer above it to be finished.
+
+A position is indexed in base 3, one digit per cell (0 empty, 1 X, 2 O),
+so every position has a fixed slot and a lookup is one index computation
+and one byte read. The table file is TABLE_MAGIC, the TABLE_HEADER and two
+int8 arrays of 3 ** cells entries each:
+
+    values  from the side to move: WIN_VALUE - plies for a win in that many
+            plies, plies - WIN_VALUE for a loss, 0 for a draw
+    moves   the best cell for the side to move, NO_MOVE once the game is over
+
+The 3x3 table is 39 KB and the 4x4 one 86 MB. SolvedTable maps the file
+read-only, so every process playing on it shares the same pages.
+
+    python solver.py                            # solve 3x3 into solved/3x3_3.ttts
+    python solver.py --size 4 --win-length 4
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from game_engine import get_geometry
+
+TABLE_MAGIC = b'TTTS\x01'
+TABLE_HEADER = struct.Struct('<BBxxQ')  # size, win_length, entries per array
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solved')
+MAX_SOLVED_CELLS = 16  # 3 ** 16 entries per array is as big as a table gets
+WIN_VALUE = 100
+NO_MOVE = -1
+
+def table_path(size, win_length):
+    return os.path.join(TABLE_DIR, f'{size}x{size}_{win_length}.ttts')
+
+def _stone_counts(cells):
+    """Stones and X-minus-O stones of every base-3 index, as two int8 arrays"""
+    stones = np.zeros(1, dtype=np.int8)
+    balance = np.zeros(1, dtype=np.int8)
+    # Prepending the next (more significant) digit repeats the array once per
+    # value of that digit
+    for _ in range(cells):
+        stones = np.concatenate((stones, stones + 1, stones + 1))
+        balance = np.concatenate((balance, balance + 1, balance - 1))
+    return stones, balance
+
+def _decode(indexes, cells):
+    """(x_masks, o_masks) of an array of base-3 indexes"""
+    x_masks = np.zeros(len(indexes), dtype=np.int64)
+    o_masks = np.zeros(len(indexes), dtype=np.int64)
+    rest = indexes.copy()
+    for cell in range(cells):
+        digit = rest % 3
+        rest //= 3
+        x_masks |= (digit == 1).astype(np.int64) << cell
+        o_masks |= (digit == 2).astype(np.int64) << cell
+    return x_masks, o_masks
+
+def _has_win(masks, line_masks):
+    won = np.zeros(len(masks), dtype=bool)
+    for line in line_masks:
+        won |= (masks & line) == line
+    return won
+
+def solve(size, win_length, log=None):
+    """Solve the variant, returns (values, moves) int8 arrays indexed by position"""
+    geometry = get_geometry(size, win_length)
+    cells = geometry.cell_count
+    if cells > MAX_SOLVED_CELLS:
+        raise ValueError(f"{size}x{size} has {cells} cells, the solver handles at most {MAX_SOLVED_CELLS}")
+    powers = 3 ** np.arange(cells, dtype=np.int64)
+    stones, balance = _stone_counts(cells)
+    legal = (balance == 0) | (balance == 1)
+    values = np.zeros(3 ** cells, dtype=np.int8)
+    moves = np.full(3 ** cells, NO_MOVE, dtype=np.int8)
+
+    for layer in range(cells, -1, -1):
+        start = time.perf_counter()
+        indexes = np.flatnonzero(legal & (stones == layer))
+        x_masks, o_masks = _decode(indexes, cells)
+        x_to_move = balance[indexes] == 0
+
+        # The player who just moved may have completed a line; treating a win
+        # for either side as a loss for the side to move also covers the
+        # unreachable positions where both have one
+        over = _has_win(x_masks, geometry.line_masks) | _has_win(o_masks, geometry.line_masks)
+        layer_values = np.where(over, -WIN_VALUE, 0).astype(np.int16)
+        layer_moves = np.full(len(indexes), NO_MOVE, dtype=np.int8)
+
+        if layer < cells:
+            live = ~over
+            best = np.full(len(indexes), -WIN_VALUE - 1, dtype=np.int16)
+            occupied = x_masks | o_masks
+            digits = np.where(x_to_move, 1, 2)
+            for cell in range(cells):
+                empty = live & ((occupied >> cell) & 1 == 0)
+                children = indexes[empty] + digits[empty] * powers[cell]
+                # A child's value is from the opponent's side and one ply further away
+                child = -values[children].astype(np.int16)
+                child -= np.sign(child)
+                better = np.zeros(len(indexes), dtype=bool)
+                better[empty] = child > best[empty]
+                best[better] = child[better[empty]]
+                layer_moves[better] = cell
+            layer_values[live] = best[live]
+
+        values[indexes] = layer_values
+        moves[indexes] = layer_moves
+        if log is not None:
+            log(f"{layer:>3} stones {len(indexes):>10} positions {time.perf_counter() - start:>8.2f}s")
+    return values, moves
+
+def write_table(path, size, win_length, values, moves):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(TABLE_MAGIC)
+        f.write(TABLE_HEADER.pack(size, win_length, len(values)))
+        f.write(values.tobytes())
+        f.write(moves.tobytes())
+
+class SolvedTable:
+    """Read-only, memory-mapped value and best-move table for one variant"""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.buffer[:len(TABLE_MAGIC)] != TABLE_MAGIC:
+            raise ValueError(f"{path} is not a solved table file")
+        self.size, self.win_length, self.entries = TABLE_HEADER.unpack_from(self.buffer, len(TABLE_MAGIC))
+        self.values_offset = len(TABLE_MAGIC) + TABLE_HEADER.size
+        self.moves_offset = self.values_offset + self.entries
+        self.powers = tuple(3 ** cell for cell in range(self.size * self.size))
+
+    def index(self, x_mask, o_mask):
+        powers = self.powers
+        index = 0
+        while x_mask:
+            low = x_mask & -x_mask
+            index += powers[low.bit_length() - 1]
+            x_mask ^= low
+        while o_mask:
+            low = o_mask & -o_mask
+            index += 2 * powers[low.bit_length() - 1]
+            o_mask ^= low
+        return index
+
+    def _read(self, offset):
+        value = self.buffer[offset]
+        return value - 256 if value > 127 else value
+
+    def value(self, x_mask, o_mask):
+        """Game value for the side to move, see the module docstring"""
+        return self._read(self.values_offset + self.index(x_mask, o_mask))
+
+    def result(self, x_mask, o_mask):
+        """(1 win, 0 draw or -1 loss for the side to move, plies until the game ends that way)"""
+        value = self.value(x_mask, o_mask)
+        if value > 0:
+            return 1, WIN_VALUE - value
+        if value < 0:
+            return -1, WIN_VALUE + value
+        return 0, None
+
+    def best_move(self, x_mask, o_mask):
+        """Best cell for the side to move, None when the game is over"""
+        move = self._read(self.moves_offset + self.index(x_mask, o_mask))
+        return None if move == NO_MOVE else move
+
+    def close(self):
+        self.buffer.close()
+
+@lru_cache(maxsize=None)
+def load_table(size, win_length):
+    """The mapped table for the variant from TABLE_DIR, None if it has not been solved"""
+    path = table_path(size, win_length)
+    return SolvedTable(path) if os.path.exists(path) else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a Tic Tac Toe variant into a perfect-play table")
+    parser.add_argument('--size', type=int, default=3, help="board is size x size")
+    parser.add_argument('--win-length', type=int, default=3, help="marks in a row to win")
+    parser.add_argument('--out', help="table file (default: solved/<size>x<size>_<win length>.ttts)")
+    args = parser.parse_args(argv)
+
+    path = args.out or table_path(args.size, args.win_length)
+    start = time.perf_counter()
+    values, moves = solve(args.size, args.win_length, log=print)
+    write_table(path, args.size, args.win_length, values, moves)
+    root = int(values[0])
+    result = "draw" if root == 0 else f"{'X' if root > 0 else 'O'} wins in {WIN_VALUE - abs(root)} plies"
+    print(f"Solved {args.size}x{args.size}, {args.win_length} in a row in {time.perf_counter() - start:.1f}s: "
+          f"{result}, first move {int(moves[0])}")
+    print(f"Wrote {path} ({os.path.getsize(path)} bytes)")
+
+if __name__ == "__main__":
+    main()
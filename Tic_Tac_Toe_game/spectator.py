@@ -0,0 +1,303 @@
+"""Spectator grid: many AI-vs-AI games running at once, tiled into one window
+
+Every tile is a game of its own. Each tick the AI turns of all running
+games go to a process pool as policy.choose_moves batches, one per worker,
+and the window keeps drawing while they are out. Finished games stay up
+for GAME_OVER_HOLD seconds, tinted by their result, then start over.
+
+Tiles are drawn from sprites made once at startup: the empty board
+(draw_grid), an X and an O (draw_x/draw_o), each drawn at the game
+screen's own size and smoothscaled down to the tile. A frame only touches
+the tiles whose board changed since the last one: a new stone is one
+sprite blit, a restarted or finished game the whole tile. All of a frame's
+blits go out in one Surface.blits call and only the changed tiles are
+pushed to the display.
+
+    python spectator.py                         # 20 x 20 games, MEDIUM vs MEDIUM
+    python spectator.py --grid 30x20 --tile 24 --pairing HARD:EASY
+    python spectator.py --grid 8 --tile 80 --size 4 --win-length 4 --move-delay 0.5
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+
+from game_engine import Difficulty, get_geometry
+from policy import choose_moves
+from python_tic_tac_toe import (
+    BLACK, BLUE, BOARD_SIZE, GRAY, LIGHT_BLUE, MAX_FPS, RED, WHITE, draw_grid, draw_o, draw_x,
+    redraw_exposed,
+)
+from self_play import parse_pairing
+
+DEFAULT_GRID = (20, 20)  # Columns, rows
+DEFAULT_TILE_SIZE = 32  # Pixels per game, the gap to its neighbours included
+TILE_GAP = 2
+MOVE_DELAY = 0.25  # Seconds between plies on every board
+GAME_OVER_HOLD = 1.0  # Seconds a finished game stays up before it restarts
+STATUS_HEIGHT = 24
+STATUS_INTERVAL = 0.5  # Seconds between status line updates
+RESULT_ALPHA = 70
+RESULT_COLORS = {'X': RED, 'O': BLUE, 'tie': GRAY}
+
+class SpectatorGame:
+    """One tile's game, stones as bitmasks, moved by the pool's answers"""
+    __slots__ = ('x_mask', 'o_mask', 'plies', 'winner', 'over_at')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.x_mask = 0
+        self.o_mask = 0
+        self.plies = 0
+        self.winner = None  # 'X', 'O' or 'tie' once the game is over
+        self.over_at = None
+
+    @property
+    def mark(self):
+        """The mark to move, X moves first"""
+        return 'X' if self.plies % 2 == 0 else 'O'
+
+    def board(self, size):
+        return [['X' if self.x_mask >> row * size + col & 1 else 'O' if self.o_mask >> row * size + col & 1
+                 else '' for col in range(size)] for row in range(size)]
+
+    def play(self, cell, geometry):
+        if self.mark == 'X':
+            self.x_mask |= 1 << cell
+            mask = self.x_mask
+        else:
+            self.o_mask |= 1 << cell
+            mask = self.o_mask
+        if geometry.wins_at(mask, cell):
+            self.winner = self.mark
+        elif self.x_mask | self.o_mask == geometry.full_mask:
+            self.winner = 'tie'
+        self.plies += 1
+
+class Spectator:
+    """Runs and draws a columns x rows grid of AI-vs-AI games"""
+    def __init__(self, columns, rows, tile_size=DEFAULT_TILE_SIZE, size=3, win_length=3,
+                 pairing=(Difficulty.MEDIUM, Difficulty.MEDIUM), workers=None, move_delay=MOVE_DELAY, seed=None):
+        self.columns = columns
+        self.rows = rows
+        self.tile_size = tile_size
+        self.size = size
+        self.win_length = win_length
+        self.geometry = get_geometry(size, win_length)
+        self.pairing = pairing
+        self.workers = workers or os.cpu_count()
+        self.move_delay = move_delay
+        self.rng = random.Random(seed)  # Seeds every AI request
+
+        pygame.display.init()
+        pygame.font.init()
+        width = columns * tile_size
+        self.screen = pygame.display.set_mode((width, rows * tile_size + STATUS_HEIGHT))
+        pygame.display.set_caption(f"Tic Tac Toe - {columns * rows} games")
+        self.frame_clock = pygame.time.Clock()
+        self.font = pygame.font.Font(None, 22)
+        self.status_rect = pygame.Rect(0, rows * tile_size, width, STATUS_HEIGHT)
+
+        self.games = [SpectatorGame() for _ in range(columns * rows)]
+        self.tile_origins = [((i % columns) * tile_size + TILE_GAP // 2, (i // columns) * tile_size + TILE_GAP // 2)
+                             for i in range(len(self.games))]
+        self.build_sprites()
+
+        # Retained rendering state: (x_mask, o_mask, winner) last drawn per tile
+        self.rendered = [None] * len(self.games)
+        self.next_status = 0
+
+        # Moves are searched in worker processes, see update()
+        self.executor = None
+        self.pending = []  # (future, games) per batch out
+        self.next_tick = 0
+        self.results = Counter()
+        self.moves = 0
+        self.status_moves = 0
+
+    def build_sprites(self):
+        """Scale the game screen's board and marks down to one tile"""
+        board_px = self.tile_size - TILE_GAP
+        master_cell = BOARD_SIZE // self.size
+        pad = max(1, 9 // self.size)  # Room for the outer grid lines
+        master_size = BOARD_SIZE + 2 * pad
+        scale = board_px / master_size
+
+        master = pygame.Surface((master_size, master_size))
+        master.fill(WHITE)
+        draw_grid(master, pad, pad, BOARD_SIZE, self.size)
+        self.board_sprite = pygame.transform.smoothscale(master, (board_px, board_px)).convert()
+
+        mark_px = max(1, round(master_cell * scale))
+        self.mark_sprites = {}
+        for mark, draw in (('X', draw_x), ('O', draw_o)):
+            master = pygame.Surface((master_cell, master_cell), pygame.SRCALPHA)
+            draw(master, 0, 0, master_cell)
+            self.mark_sprites[mark] = pygame.transform.smoothscale(master, (mark_px, mark_px)).convert_alpha()
+        # Top left corner of each cell within a tile
+        self.cell_offsets = [(round((pad + col * master_cell) * scale), round((pad + row * master_cell) * scale))
+                             for row in range(self.size) for col in range(self.size)]
+
+        self.result_sprites = {}
+        for result, color in RESULT_COLORS.items():
+            overlay = pygame.Surface((board_px, board_px)).convert()
+            overlay.fill(color)
+            overlay.set_alpha(RESULT_ALPHA)
+            self.result_sprites[result] = overlay
+
+    def update(self):
+        """Apply finished batches and, once every batch is in, start the next tick"""
+        now = time.perf_counter()
+        pending = []
+        for future, games in self.pending:
+            if not future.done():
+                pending.append((future, games))
+                continue
+            for game, move in zip(games, future.result()):
+                if move is None or game.winner is not None:
+                    continue
+                row, col = move
+                game.play(row * self.size + col, self.geometry)
+                self.moves += 1
+                if game.winner is not None:
+                    game.over_at = now
+                    self.results[game.winner] += 1
+        self.pending = pending
+        if pending or now < self.next_tick:
+            return
+        self.next_tick = now + self.move_delay
+
+        # Every running game makes one ply per tick
+        requests = []
+        games = []
+        for game in self.games:
+            if game.winner is not None and now - game.over_at >= GAME_OVER_HOLD:
+                game.reset()
+            if game.winner is None:
+                difficulty = self.pairing[0] if game.mark == 'X' else self.pairing[1]
+                requests.append((game.board(self.size), difficulty, self.rng.getrandbits(64)))
+                games.append(game)
+        if not requests:
+            return
+        if self.executor is None:
+            # Spawned rather than forked, so the workers start without the parent's SDL state
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        chunk = -(-len(requests) // self.workers)
+        for start in range(0, len(requests), chunk):
+            future = self.executor.submit(choose_moves, requests[start:start + chunk], self.size, self.win_length)
+            self.pending.append((future, games[start:start + chunk]))
+
+    def render(self, full=False):
+        """Redraw the tiles whose game changed and push only those; returns the dirty rects"""
+        blits = []
+        dirty = []
+        board_px = self.tile_size - TILE_GAP
+        mark_sprites = self.mark_sprites
+        cells = self.geometry.cells
+        for i, game in enumerate(self.games):
+            state = (game.x_mask, game.o_mask, game.winner)
+            old = self.rendered[i]
+            if state == old and not full:
+                continue
+            x, y = self.tile_origins[i]
+            if (full or old is None or old[2] != game.winner or
+                    old[0] & ~game.x_mask or old[1] & ~game.o_mask):
+                # Restarted, finished or never drawn: the whole tile
+                blits.append((self.board_sprite, (x, y)))
+                new_x, new_o = game.x_mask, game.o_mask
+            else:
+                # Only the stones placed since the last frame
+                new_x, new_o = game.x_mask & ~old[0], game.o_mask & ~old[1]
+            for mask, sprite in ((new_x, mark_sprites['X']), (new_o, mark_sprites['O'])):
+                for cell in cells(mask):
+                    dx, dy = self.cell_offsets[cell]
+                    blits.append((sprite, (x + dx, y + dy)))
+            if game.winner is not None:
+                blits.append((self.result_sprites[game.winner], (x, y)))
+            self.rendered[i] = state
+            dirty.append(pygame.Rect(x, y, board_px, board_px))
+        if blits:
+            self.screen.blits(blits, doreturn=False)
+
+        now = time.perf_counter()
+        if full or now >= self.next_status:
+            self.draw_status(now)
+            dirty.append(self.status_rect)
+        return dirty
+
+    def draw_status(self, now):
+        """Games finished, results, moves per second and frame rate"""
+        interval = now - self.next_status + STATUS_INTERVAL
+        rate = (self.moves - self.status_moves) / interval if self.next_status else 0.0
+        self.status_moves = self.moves
+        self.next_status = now + STATUS_INTERVAL
+
+        finished = sum(self.results.values())
+        share = {result: self.results[result] / finished if finished else 0.0 for result in RESULT_COLORS}
+        text = (f"{self.pairing[0].name} vs {self.pairing[1].name}   {finished} games   "
+                f"X {share['X']:.1%}  O {share['O']:.1%}  tie {share['tie']:.1%}   "
+                f"{rate:.0f} moves/s   {self.frame_clock.get_fps():.0f} fps")
+        pygame.draw.rect(self.screen, LIGHT_BLUE, self.status_rect)
+        text_surface = self.font.render(text, True, BLACK)
+        self.screen.blit(text_surface, (5, self.status_rect.y + (STATUS_HEIGHT - text_surface.get_height()) // 2))
+
+    def run(self):
+        self.screen.fill(LIGHT_BLUE)
+        self.render(full=True)
+        pygame.display.flip()
+
+        running = True
+        while running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    running = False
+                else:
+                    redraw_exposed(event)
+            self.update()
+            dirty = self.render()
+            if dirty:
+                pygame.display.update(dirty)
+            self.frame_clock.tick(MAX_FPS)
+
+        self.close()
+        pygame.quit()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+def parse_grid(text):
+    """"20x15" is 20 columns by 15 rows, "20" a 20 x 20 grid"""
+    columns, _, rows = text.lower().partition('x')
+    return int(columns), int(rows or columns)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch a grid of AI-vs-AI Tic Tac Toe games")
+    parser.add_argument('--grid', type=parse_grid, default=DEFAULT_GRID, help="columns x rows, e.g. 20x20")
+    parser.add_argument('--tile', type=int, default=DEFAULT_TILE_SIZE, help="pixels per game")
+    parser.add_argument('--pairing', type=parse_pairing, default=(Difficulty.MEDIUM, Difficulty.MEDIUM),
+                        help="X:O difficulties, e.g. HARD:EASY")
+    parser.add_argument('--size', type=int, default=3, help="board is size x size")
+    parser.add_argument('--win-length', type=int, default=3, help="marks in a row to win")
+    parser.add_argument('--workers', type=int, default=None, help="default: all cores")
+    parser.add_argument('--move-delay', type=float, default=MOVE_DELAY, help="seconds between plies")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    columns, rows = args.grid
+    Spectator(columns, rows, args.tile, args.size, args.win_length, args.pairing, args.workers,
+              args.move_delay, args.seed).run()
+
+if __name__ == "__main__":
+    sys.exit(main())
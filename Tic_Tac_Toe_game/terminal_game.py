@@ -0,0 +1,95 @@
+"""Play against the AI in a terminal, without pygame or SDL
+
+The same GameEngine rules and AI as the window, with moves typed in as
+"row col" (1-based). There is no turn timer: the game waits for input and
+the AI answers as soon as its search is done.
+
+    python terminal_game.py
+    python terminal_game.py --difficulty hard --size 4 --win-length 4
+    python python_tic_tac_toe.py --headless --difficulty mcts
+"""
+import argparse
+import sys
+
+from game_engine import Difficulty, GameEngine, GameState, Player
+from game_record import GameRecordWriter
+
+def format_board(engine):
+    """The board as text, with 1-based row and column numbers"""
+    width = len(str(engine.size))
+    lines = [' ' * (width + 1) + ' '.join(f'{col + 1:>{width}}' for col in range(engine.size))]
+    for row in range(engine.size):
+        cells = ' '.join(f'{engine.board[row][col] or ".":>{width}}' for col in range(engine.size))
+        lines.append(f'{row + 1:>{width}} {cells}')
+    return '\n'.join(lines)
+
+def parse_move(text, engine):
+    """(row, col) for "row col" text naming an empty cell, None otherwise"""
+    parts = text.replace(',', ' ').split()
+    if len(parts) != 2 or not all(part.isdigit() for part in parts):
+        return None
+    row, col = int(parts[0]) - 1, int(parts[1]) - 1
+    if not (0 <= row < engine.size and 0 <= col < engine.size) or engine.board[row][col]:
+        return None
+    return row, col
+
+def play(engine, read=input, write=print):
+    """Play one game on engine, human as X; returns the winner, None if the player quit"""
+    engine.reset_game()
+    while engine.state == GameState.PLAYING:
+        if engine.current_player == Player.AI:
+            row, col = engine.ai_strategic_move()
+            write(f"Computer plays {row + 1} {col + 1}")
+            engine.make_move(row, col)
+            continue
+        write(format_board(engine))
+        try:
+            text = read("Your move (row col, q to quit): ")
+        except EOFError:
+            return None
+        if text.strip().lower() in ('q', 'quit'):
+            return None
+        move = parse_move(text, engine)
+        if move is None:
+            write("Enter the row and column of an empty cell, e.g. 2 3")
+            continue
+        engine.make_move(*move)
+
+    write(format_board(engine))
+    if engine.winner == 'X':
+        write("You Win!")
+    elif engine.winner == 'O':
+        write("Computer Wins!")
+    else:
+        write("It's a Tie!")
+    return engine.winner
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tic Tac Toe against the computer in the terminal")
+    parser.add_argument('--difficulty', type=str.upper, choices=[d.name for d in Difficulty], default='MEDIUM')
+    parser.add_argument('--size', type=int, default=3, help="board is size x size")
+    parser.add_argument('--win-length', type=int, default=3, help="marks in a row to win")
+    parser.add_argument('--record', metavar='PATH', help="append every finished game to a record file")
+    args = parser.parse_args(argv)
+
+    engine = GameEngine(args.size, args.win_length)
+    engine.difficulty = Difficulty[args.difficulty]
+    if args.record:
+        engine.recorder = GameRecordWriter(args.record)
+    try:
+        while play(engine) is not None:
+            try:
+                again = input("Play again? [y/N] ")
+            except EOFError:
+                break
+            if again.strip().lower() not in ('y', 'yes'):
+                break
+    except KeyboardInterrupt:
+        print()
+    finally:
+        if engine.recorder is not None:
+            engine.recorder.close()
+        engine.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The game modules import each other by bare name, as they do when run from their folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Tic_Tac_Toe_game'))
@@ -0,0 +1,31 @@
+"""batch_rules against the single-board GameEngine methods"""
+import itertools
+
+import numpy as np
+
+from batch_rules import EMPTY, NO_MOVE, O, TIE, X, analyze, boards_to_array
+from game_engine import GameEngine
+
+MARKS = {X: 'X', O: 'O'}
+
+def test_analyze_matches_engine():
+    engine = GameEngine()
+    boards = [[list(cells[row * 3:row * 3 + 3]) for row in range(3)]
+              for cells in itertools.product(('', 'X', 'O'), repeat=9)]
+    array = boards_to_array(boards)
+    for player in (X, O):
+        opponent = MARKS[O if player == X else X]
+        result = analyze(array, player)
+        for i, board in enumerate(boards):
+            winner = engine.check_winner_board(board)
+            if winner is None and engine.is_board_full_board(board):
+                winner = 'tie'
+            expected = {None: EMPTY, 'X': X, 'O': O, 'tie': TIE}[winner]
+            assert result.winner[i] == expected
+            assert list(result.empty[i]) == [cell == '' for row in board for cell in row]
+            if winner:
+                continue  # The engine only looks for moves while the game is on
+            for moves, found in ((result.winning_move, engine.find_winning_move(board, MARKS[player])),
+                                 (result.blocking_move, engine.find_blocking_move(board, opponent))):
+                assert moves[i] == (NO_MOVE if found is None else found[0] * 3 + found[1])
+    assert np.all(result.winning_mask.any(axis=1) == (result.winning_move != NO_MOVE))
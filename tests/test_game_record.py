@@ -0,0 +1,34 @@
+"""encode_record/decode_record round trips"""
+import random
+
+import pytest
+
+from game_engine import BOARD_VARIANTS, Difficulty, GameEngine, GameState, VirtualClock
+from game_record import NIBBLE_CELLS, GameRecord, decode_record, encode_record
+
+def random_records(size, win_length, count, rng):
+    engine = GameEngine(size, win_length, clock=VirtualClock())
+    for _ in range(count):
+        engine.difficulty = rng.choice(list(Difficulty))
+        engine.reset_game(rng.getrandbits(64))
+        while engine.state == GameState.PLAYING and rng.random() > 0.02:
+            engine.make_move(*rng.choice(engine.get_empty_cells()), timed_out=rng.random() < 0.2)
+            engine.clock.advance(rng.random() * 10)
+        yield GameRecord.from_engine(engine)
+
+@pytest.mark.parametrize('size, win_length', BOARD_VARIANTS)
+def test_records_round_trip(size, win_length):
+    rng = random.Random(size)
+    records = list(random_records(size, win_length, 50, rng))
+    buffer = b''.join(encode_record(record) for record in records)
+    offset = 0
+    for record in records:
+        decoded, offset = decode_record(buffer, offset)
+        for field in ('size', 'win_length', 'difficulty', 'seed', 'started', 'moves', 'timeouts', 'winner'):
+            assert getattr(decoded, field) == getattr(record, field)
+        assert decoded.duration == int(record.duration * 1000) / 1000
+    assert offset == len(buffer)
+
+def test_both_move_layouts_are_covered():
+    cells = [size * size for size, _ in BOARD_VARIANTS]
+    assert min(cells) <= NIBBLE_CELLS < max(cells)
@@ -0,0 +1,48 @@
+"""The solved 3x3 table against full-depth minimax"""
+import pytest
+
+from game_engine import GameEngine
+from solver import SolvedTable, solve, write_table
+
+@pytest.fixture(scope='module')
+def table(tmp_path_factory):
+    path = tmp_path_factory.mktemp('solved') / '3x3_3.ttts'
+    write_table(path, 3, 3, *solve(3, 3))
+    table = SolvedTable(path)
+    yield table
+    table.close()
+
+def live_positions(geometry):
+    """(x_mask, o_mask, mark) of every reachable 3x3 position with moves left"""
+    for index in range(3 ** geometry.cell_count):
+        x_mask = o_mask = 0
+        for cell in range(geometry.cell_count):
+            index, digit = divmod(index, 3)
+            if digit == 1:
+                x_mask |= 1 << cell
+            elif digit == 2:
+                o_mask |= 1 << cell
+        balance = bin(x_mask).count('1') - bin(o_mask).count('1')
+        if balance not in (0, 1) or geometry.has_win(x_mask) or geometry.has_win(o_mask):
+            continue
+        if x_mask | o_mask != geometry.full_mask:
+            yield x_mask, o_mask, 'X' if balance == 0 else 'O'
+
+def test_table_matches_search(table):
+    engine = GameEngine()
+    geometry = engine.geometry
+    positions = 0
+    for x_mask, o_mask, mark in live_positions(geometry):
+        move, score = engine.search_move(x_mask, o_mask, mark)
+        # search_move scores a win in plies plies as win_score + 1 - plies
+        result, plies = table.result(x_mask, o_mask)
+        assert score == (0 if result == 0 else result * (geometry.win_score + 1 - plies))
+        # The searched move keeps the table's value
+        if mark == 'X':
+            child = -table.value(x_mask | 1 << move, o_mask)
+        else:
+            child = -table.value(x_mask, o_mask | 1 << move)
+        child -= (child > 0) - (child < 0)
+        assert child == table.value(x_mask, o_mask)
+        positions += 1
+    assert positions == 4520
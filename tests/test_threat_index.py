@@ -0,0 +1,40 @@
+"""ThreatIndex against the BoardGeometry scans it replaces"""
+import random
+
+import pytest
+
+from game_engine import BOARD_VARIANTS, GameEngine, GameState, ThreatIndex, VirtualClock
+
+def check_threats(engine):
+    geometry, threats = engine.geometry, engine.threats
+    # The incremental index equals one built from scratch...
+    fresh = ThreatIndex(geometry)
+    fresh.sync(engine.x_mask, engine.o_mask)
+    assert (threats.counts, threats.threats, threats.builders) == (fresh.counts, fresh.threats, fresh.builders)
+    if engine.state != GameState.PLAYING:
+        return
+    # ...and answers like the full scans while the game is on
+    for mark, own, other in (('X', engine.x_mask, engine.o_mask), ('O', engine.o_mask, engine.x_mask)):
+        winning_cell = threats.winning_cell(mark)
+        assert winning_cell == geometry.winning_cell(own, other)
+        # Forks are only looked for once there is no win to take
+        if winning_cell is None:
+            assert threats.fork_cell(mark) == geometry.fork_cell(own, other)
+
+@pytest.mark.parametrize('size, win_length', BOARD_VARIANTS)
+def test_threat_index_matches_geometry(size, win_length):
+    rng = random.Random(size * 100 + win_length)
+    engine = GameEngine(size, win_length, clock=VirtualClock())
+    # geometry.fork_cell scans every empty cell, so big boards get fewer games
+    for _ in range(20 if size * size <= 25 else 2):
+        engine.reset_game(rng.getrandbits(32))
+        check_threats(engine)
+        while engine.state == GameState.PLAYING:
+            action = rng.random()
+            if action < 0.15 and engine.undo():
+                pass
+            elif action < 0.25 and engine.redo():
+                pass
+            else:
+                engine.make_move(*rng.choice(engine.get_empty_cells()))
+            check_threats(engine)